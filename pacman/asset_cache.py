@@ -0,0 +1,133 @@
+import os
+import struct
+import pygame
+
+
+class AssetCache:
+    """Process wide cache of images, sprite sheet frames and fonts,
+    so every game object shares one loaded, scaled and converted copy of each asset"""
+    files = {}      # images as loaded from disk, keyed by file name
+    images = {}     # prepared images, keyed by (file, rect, resize, flip, convert)
+    fonts = {}      # fonts, keyed by (file, size)
+    sheets = {}     # images scaled a cell at a time, keyed by (file, cell size, scaled cell size)
+    disk_dir = None     # directory scaled images are kept in between runs, none if not set
+    DISK_HEADER = struct.Struct('<4sIIQ')   # magic, width, height, modification time of the source in ns
+    DISK_MAGIC = b'PMSI'
+
+    @classmethod
+    def load(cls, img):
+        """Return an image file from the images folder exactly as it was loaded"""
+        surface = cls.files.get(img)
+        if surface is None:
+            surface = pygame.image.load('images/' + img)
+            cls.files[img] = surface
+        return surface
+
+    @classmethod
+    def image(cls, img, rect=None, resize=None, flip=(False, False), convert=True):
+        """Return an image, or an area of a sprite sheet, resized, converted to the display format
+        and flipped as requested; conversion is skipped while no display mode is set"""
+        display = pygame.display.get_surface()
+        convert = bool(convert and display)
+        key = (img, tuple(rect) if rect else None, tuple(resize) if resize else None, tuple(flip), convert)
+        surface = cls.images.get(key)
+        if surface is None:
+            surface = cls.load(img)
+            select = pygame.Rect(rect) if rect else surface.get_rect()
+            if resize and select.x % select.width == 0 and select.y % select.height == 0:
+                # cut from the image pre-scaled for this size, rather than scaling each frame
+                surface = cls.scaled_sheet(img, select.size, resize)
+                select = pygame.Rect(select.x // select.width * resize[0], select.y // select.height * resize[1],
+                                     *resize)
+                resize = None
+            if rect:    # copy the frame out of the sprite sheet onto a black background
+                frame = pygame.Surface(select.size)
+                if display:
+                    frame = frame.convert(display)
+                frame.blit(surface, (0, 0), select)
+                surface = frame
+            if resize:
+                surface = pygame.transform.scale(surface, resize)
+            if convert:
+                surface = surface.convert()
+            if any(flip):
+                surface = pygame.transform.flip(surface, *flip)
+            cls.images[key] = surface
+        return surface
+
+    @classmethod
+    def scaled_sheet(cls, img, cell, size):
+        """Return an image scaled a cell at a time, each cell of the given size in the image becoming one of the
+        scaled size, read from the disk cache if the image was scaled to this size before"""
+        key = (img, tuple(cell), tuple(size))
+        sheet = cls.sheets.get(key)
+        if sheet is None:
+            sheet = cls.read_scaled(key)
+            if sheet is None:
+                source = cls.load(img)
+                cols, rows = source.get_width() // cell[0], source.get_height() // cell[1]
+                sheet = pygame.Surface((cols * size[0], rows * size[1]), pygame.SRCALPHA, 32)
+                for row in range(rows):
+                    for col in range(cols):
+                        scaled = pygame.transform.scale(source.subsurface((col * cell[0], row * cell[1], *cell)),
+                                                        size)
+                        # added onto the transparent sheet, copying every channel as it is
+                        sheet.blit(scaled, (col * size[0], row * size[1]), special_flags=pygame.BLEND_RGBA_ADD)
+                cls.write_scaled(key, sheet)
+            cls.sheets[key] = sheet
+        return sheet
+
+    @classmethod
+    def disk_path(cls, key):
+        """Return the disk cache file of a scaled image"""
+        img, cell, size = key
+        return os.path.join(cls.disk_dir, '{}-{}x{}-{}x{}.rgba'.format(img, *cell, *size))
+
+    @classmethod
+    def read_scaled(cls, key):
+        """Return a scaled image from the disk cache, or None if it is not there or its source has changed since"""
+        if not cls.disk_dir:
+            return None
+        try:
+            with open(cls.disk_path(key), 'rb') as file:
+                data = file.read()
+            magic, width, height, mtime = AssetCache.DISK_HEADER.unpack_from(data)
+            if magic != AssetCache.DISK_MAGIC or mtime != os.stat('images/' + key[0]).st_mtime_ns:
+                return None
+            return pygame.image.frombytes(data[AssetCache.DISK_HEADER.size:], (width, height), 'RGBA')
+        except (OSError, struct.error, ValueError):
+            return None     # scale it again
+
+    @classmethod
+    def write_scaled(cls, key, sheet):
+        """Keep a scaled image in the disk cache for later runs, if there is one"""
+        if not cls.disk_dir:
+            return
+        path = cls.disk_path(key)
+        try:
+            os.makedirs(cls.disk_dir, exist_ok=True)
+            header = AssetCache.DISK_HEADER.pack(AssetCache.DISK_MAGIC, *sheet.get_size(),
+                                                 os.stat('images/' + key[0]).st_mtime_ns)
+            with open(path + '.tmp', 'wb') as file:
+                file.write(header + pygame.image.tobytes(sheet, 'RGBA'))
+            os.replace(path + '.tmp', path)     # readers never see a partly written file
+        except OSError:
+            pass    # only kept in memory
+
+    @classmethod
+    def font(cls, font_file, size):
+        """Return a font of the given size, where a font file of None means pygame's default font"""
+        key = (font_file, size)
+        font = cls.fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(font_file, size)
+            cls.fonts[key] = font
+        return font
+
+    @classmethod
+    def clear(cls):
+        """Forget every cached asset"""
+        cls.files.clear()
+        cls.images.clear()
+        cls.fonts.clear()
+        cls.sheets.clear()
@@ -0,0 +1,69 @@
+import pygame
+
+
+class Atlas:
+    """Process wide texture atlas which packs every animation frame onto a few large page surfaces as they are
+    loaded, handing out frames as subsurfaces of a page. Frames are packed once and never drawn into afterwards,
+    so frames which combine images, such as a ghost's body with its eyes, are composited ahead of time"""
+    PAGE_SIZE = (512, 512)
+    pages = []  # page surfaces, the last one being filled
+    frames = {}     # packed frames, keyed by the key they were packed with
+    shelf = (0, 0, 0)   # x and y of the next free spot on the last page, and the height of its row
+
+    @classmethod
+    def new_page(cls, size):
+        """Start a new page at least as large as the given size"""
+        page = pygame.Surface((max(size[0], Atlas.PAGE_SIZE[0]), max(size[1], Atlas.PAGE_SIZE[1])))
+        display = pygame.display.get_surface()
+        if display:
+            page = page.convert(display)
+        page.fill((0, 0, 0))
+        cls.pages.append(page)
+        cls.shelf = (0, 0, 0)
+        return page
+
+    @classmethod
+    def place(cls, size):
+        """Reserve an area of the given size, filling each page in rows from the top left"""
+        width, height = size
+        page = cls.pages[-1] if cls.pages else cls.new_page(size)
+        x, y, row_height = cls.shelf
+        if x + width > page.get_width():  # start a new row
+            x, y, row_height = 0, y + row_height, 0
+        if y + height > page.get_height():
+            page = cls.new_page(size)
+            x, y, row_height = 0, 0, 0
+        cls.shelf = (x + width, y, max(row_height, height))
+        return page, pygame.Rect(x, y, width, height)
+
+    @classmethod
+    def pack(cls, key, surface):
+        """Return the frame packed under a key, copying the surface and its color key onto a page the first time"""
+        frame = cls.frames.get(key)
+        if frame is None:
+            page, area = cls.place(surface.get_size())
+            colorkey = surface.get_colorkey()
+            surface.set_colorkey(None)  # copy every pixel, including those which will be transparent
+            page.blit(surface, area)
+            surface.set_colorkey(colorkey)
+            frame = page.subsurface(area)
+            frame.set_colorkey(colorkey)
+            cls.frames[key] = frame
+        return frame
+
+    @classmethod
+    def composite(cls, key, base, overlay):
+        """Return the frame packed under a key, drawing an overlay over a base frame the first time"""
+        frame = cls.frames.get(key)
+        if frame is None:
+            surface = base.copy()
+            surface.blit(overlay, (0, 0))
+            frame = cls.pack(key, surface)
+        return frame
+
+    @classmethod
+    def clear(cls):
+        """Forget every packed frame"""
+        cls.pages.clear()
+        cls.frames.clear()
+        cls.shelf = (0, 0, 0)
@@ -0,0 +1,74 @@
+import itertools
+import pygame
+
+
+class AudioBank:
+    """Process wide cache of sounds and pool of mixer channels. Each sound file is loaded once, which decodes it and
+    converts it to the mixer's format, and sounds are played on whichever channel is free, taking over the channel
+    of the least important, oldest sound when every channel is busy"""
+    FREQUENCY = 44100   # the format every file in sounds/ is recorded in, so loading them needs no resampling
+    SIZE = -16
+    CHANNELS = 2
+    BUFFER = 512    # samples, small enough to start sounds within a frame
+    VOICES = 8  # channels in the pool
+    sounds = {}     # sounds as loaded and converted, keyed by file name, None for files which could not be loaded
+    voices = {}     # channel index -> (priority, start order) of the sound last started on it
+    order = itertools.count()
+
+    @staticmethod
+    def pre_init():
+        """Request the mixer format, must be called before pygame.init"""
+        pygame.mixer.pre_init(AudioBank.FREQUENCY, AudioBank.SIZE, AudioBank.CHANNELS, AudioBank.BUFFER)
+
+    @classmethod
+    def load(cls, sound_file):
+        """Return a sound from the sounds folder, or None if it is missing or there is no audio device"""
+        if sound_file not in cls.sounds:
+            sound = None
+            if pygame.mixer.get_init():
+                try:
+                    sound = pygame.mixer.Sound('sounds/' + sound_file)
+                except (FileNotFoundError, pygame.error):
+                    pass    # play nothing in its place
+            cls.sounds[sound_file] = sound
+        return cls.sounds[sound_file]
+
+    @classmethod
+    def preload(cls, sound_files):
+        """Load every one of the given sound files, so none are decoded during play"""
+        for sound_file in sound_files:
+            cls.load(sound_file)
+
+    @classmethod
+    def find_voice(cls, priority):
+        """Return the index of a free channel, or of the channel playing the least important and oldest sound
+        if that is no more important than the given priority, or None if every channel is taken"""
+        if pygame.mixer.get_num_channels() != AudioBank.VOICES:
+            pygame.mixer.set_num_channels(AudioBank.VOICES)
+        busy = []
+        for index in range(AudioBank.VOICES):
+            if not pygame.mixer.Channel(index).get_busy():
+                return index
+            busy.append((cls.voices.get(index, (0, -1)), index))
+        voice, index = min(busy)
+        return index if voice[0] <= priority else None
+
+    @classmethod
+    def play(cls, sound, priority=0, loops=0, volume=1.0):
+        """Play a sound on a pooled channel, returning the channel or None if nothing was played"""
+        if sound is None:
+            return None
+        index = cls.find_voice(priority)
+        if index is None:
+            return None
+        channel = pygame.mixer.Channel(index)
+        channel.play(sound, loops=loops)
+        channel.set_volume(volume)
+        cls.voices[index] = (priority, next(cls.order))
+        return channel
+
+    @classmethod
+    def clear(cls):
+        """Forget every loaded sound"""
+        cls.sounds.clear()
+        cls.voices.clear()
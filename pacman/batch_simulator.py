@@ -0,0 +1,395 @@
+import numpy as np
+from ghost_behavior import PERSONALITIES, SCATTER, Clyde, PhaseSchedule
+from pathfinding import PathFinder
+
+
+class BatchSimulator:
+    """Advances many independent games in lockstep, holding actor positions, pellets and ghost states
+    in NumPy arrays while following the movement and eating rules of PacMan and Ghost"""
+
+    STEP_MS = 1000 / 60
+    NONE = -1   # directions, in the same order as PathFinder.DIRECTIONS
+    UP, LEFT, DOWN, RIGHT = 0, 1, 2, 3
+    DX = np.array([0, -1, 0, 1])
+    DY = np.array([-1, 0, 1, 0])
+    STEPS = np.stack([DY, DX], axis=-1)     # (row, col) step of each direction
+    BLINKY, PINKY, INKY, CLYDE = 0, 1, 2, 3     # personalities, given out in turn as in GameState.spawn_ghosts
+
+    GHOST_DISABLED, GHOST_NORMAL, GHOST_BLUE, GHOST_RETURN = 0, 1, 2, 3
+    PLAYING, TRANSITION, DYING, CLEARED, OVER = 0, 1, 2, 3, 4
+
+    PAD = 2     # open tiles added around the wall grid, so out of bounds lookups behave like Maze.is_blocked
+
+    def __init__(self, n_games, maze_map_file='maze_map.txt', block_size=10, initial_lives=3, seed=None):
+        with open(maze_map_file, 'r') as file:
+            map_lines = file.readlines()
+        self.n_games = n_games
+        self.block_size = block_size
+        self.initial_lives = initial_lives
+        self.rng = np.random.default_rng(seed)
+        self.path_finder = PathFinder(map_lines)
+        rows, cols = self.path_finder.rows, self.path_finder.cols
+        self.rows, self.cols = rows, cols
+        chars = np.full((rows, cols), ' ', dtype='<U1')
+        for i, line in enumerate(map_lines):
+            line = line.rstrip('\n')
+            chars[i, :len(line)] = list(line)
+        self.walls = np.zeros((rows + 2 * self.PAD, cols + 2 * self.PAD), dtype=bool)
+        self.walls[self.PAD:-self.PAD, self.PAD:-self.PAD] = chars == 'X'
+        self.shields = np.zeros_like(self.walls)
+        self.shields[self.PAD:-self.PAD, self.PAD:-self.PAD] = chars == 's'
+        self.pellet_tiles = chars == '*'    # fruit and pellets share these tiles
+        self.power_tiles = chars == '@'
+        # the same roaming exits table as PathFinder.roaming_exits, as a mask of open directions per tile
+        exits = np.array([[d in e for d, _, _ in PathFinder.DIRECTIONS] for e in self.path_finder.roaming_exits],
+                         dtype=bool)
+        self.exits = exits.reshape(rows, cols, 4)
+        self.corridors = self.exits.sum(axis=-1) <= 2
+        player = np.argwhere(chars == 'o')[0]
+        self.player_spawn = player[::-1] * block_size   # rect top left, (x, y)
+        ghost_tiles = [tuple(t) for t in np.argwhere(chars == 'g')]
+        self.n_ghosts = len(ghost_tiles)
+        self.ghost_tiles = np.array(ghost_tiles).reshape(-1, 2)
+        self.ghost_spawn = self.ghost_tiles[:, ::-1] * block_size
+        # direction to step in from each tile to head home, and out of the ghost house, from the distance fields
+        house_exits = [self.path_finder.house_exit(tile) for tile in ghost_tiles]
+        self.has_house_exit = np.array([tile is not None for tile in house_exits], dtype=bool)
+        self.return_dirs = np.stack([self.downhill(tile) for tile in ghost_tiles]).reshape(-1, rows, cols)
+        self.leave_dirs = np.stack([self.downhill(tile) for tile in house_exits]).reshape(-1, rows, cols)
+        self.kinds = np.arange(self.n_ghosts) % len(PERSONALITIES)
+        self.corners = np.array([(rows if p.CORNER[0] else -1, cols if p.CORNER[1] else -1)
+                                 for p in PERSONALITIES])[self.kinds]
+        teleports = np.argwhere(chars == 't')
+        self.teleports = teleports[:, ::-1] * block_size if len(teleports) == 2 else None
+
+        self.pac_speed = block_size // 7    # same speeds and timings as PacMan, Ghost and GameState
+        self.ghost_speed = int(block_size / 10)
+        self.blue_steps = self.steps(5000)
+        self.return_delay_steps = self.steps(1000)
+        self.activate_steps = self.steps(min(2500, 10000 // max(self.n_ghosts, 1)))    # GameState.GHOST_RELEASE_MS
+        self.scatter = np.array([phase == SCATTER for phase, _ in PhaseSchedule.PHASES])
+        self.phase_steps = np.array([self.steps(ms) for _, ms in PhaseSchedule.PHASES])
+        self.rebuild_steps = self.steps(4000)
+        self.clear_steps = self.steps(1000)
+        self.transition_steps = self.steps(5000) + 1
+
+        n, g = n_games, self.n_ghosts
+        self.pac_xy = np.zeros((n, 2), dtype=np.int32)
+        self.pac_dir = np.full(n, self.NONE, dtype=np.int8)
+        self.pac_moving = np.zeros(n, dtype=bool)
+        self.pac_dead = np.zeros(n, dtype=bool)
+        self.ghost_xy = np.zeros((n, g, 2), dtype=np.int32)
+        self.ghost_tile = np.zeros((n, g, 2), dtype=np.int32)     # last tile reached, as (row, col)
+        self.ghost_progress = np.zeros((n, g), dtype=np.int32)    # distance moved on from that tile
+        self.ghost_dir = np.full((n, g), self.NONE, dtype=np.int8)
+        self.ghost_mode = np.zeros((n, g), dtype=np.int8)
+        self.ghost_leaving = np.zeros((n, g), dtype=bool)  # heading out of the ghost house
+        self.ghost_phase = np.zeros(n, dtype=np.int32)  # index into PhaseSchedule.PHASES
+        self.ghost_phase_timer = np.zeros(n, dtype=np.int32)
+        self.ghost_since = np.zeros((n, g), dtype=np.int64)    # tick the blue or return state began
+        self.ghost_speeds = np.full(n, self.ghost_speed, dtype=np.int32)
+        self.ghosts_enabled = np.zeros(n, dtype=np.int32)  # ghosts are enabled in spawn order
+        self.activate_timer = np.zeros(n, dtype=np.int32)
+        self.pellets = np.zeros((n, rows, cols), dtype=bool)
+        self.fruits = np.zeros((n, rows, cols), dtype=bool)
+        self.power_pellets = np.zeros((n, rows, cols), dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.fruit_count = np.zeros(n, dtype=np.int32)
+        self.lives = np.zeros(n, dtype=np.int32)
+        self.level = np.ones(n, dtype=np.int32)
+        self.phase = np.zeros(n, dtype=np.int8)
+        self.phase_timer = np.zeros(n, dtype=np.int32)
+        self.ticks = 0
+        self.reset()
+
+    def downhill(self, target):
+        """Return the direction of the first step on a shortest route from every tile to the target, as
+        PathFinder.direction_to gives it, or NONE where there is none"""
+        rows, cols = self.rows, self.cols
+        dirs = np.full((rows, cols), self.NONE, dtype=np.int8)
+        if target is None:
+            return dirs
+        field = np.array(self.path_finder.distance_field(target)).reshape(rows, cols)
+        field = np.where(field < 0, np.iinfo(np.int32).max, field)
+        padded = np.pad(field, 1, constant_values=np.iinfo(np.int32).max)
+        best = field.copy()
+        for d, neighbor in ((self.UP, padded[:-2, 1:-1]), (self.LEFT, padded[1:-1, :-2]),
+                            (self.DOWN, padded[2:, 1:-1]), (self.RIGHT, padded[1:-1, 2:])):
+            closer = neighbor < best
+            dirs[closer] = d
+            best = np.minimum(best, neighbor)
+        return dirs
+
+    def steps(self, ms):
+        """Convert a duration in milliseconds to a number of simulation steps"""
+        return int(round(ms / BatchSimulator.STEP_MS))
+
+    def reset(self, games=None):
+        """Start new games, either for all games or those selected by a boolean mask"""
+        games = np.ones(self.n_games, dtype=bool) if games is None else np.asarray(games, dtype=bool)
+        self.score[games] = 0
+        self.fruit_count[games] = 0
+        self.lives[games] = self.initial_lives
+        self.level[games] = 1
+        self.pac_dir[games] = self.NONE
+        self.pac_moving[games] = False
+        self.ghost_speeds[games] = self.ghost_speed
+        self.rebuild(games)
+
+    def rebuild(self, games):
+        """Restore the pellets and actor positions of the selected games, then show the level transition"""
+        n = int(games.sum())
+        if not n:
+            return
+        roll = self.rng.integers(0, 100, size=(n, self.rows, self.cols))
+        self.pellets[games] = self.pellet_tiles & (roll > 1)     # same odds as Maze.build_maze
+        self.fruits[games] = self.pellet_tiles & (roll <= 1)
+        self.power_pellets[games] = self.power_tiles
+        self.pac_xy[games] = self.player_spawn
+        self.pac_dead[games] = False
+        self.ghost_xy[games] = self.ghost_spawn
+        self.ghost_tile[games] = self.ghost_tiles
+        self.ghost_progress[games] = 0
+        self.disable_ghosts(games)
+        self.phase[games] = self.TRANSITION
+        self.phase_timer[games] = self.transition_steps
+
+    def disable_ghosts(self, games):
+        """Disable every ghost of the selected games and cancel pending ghost activations"""
+        self.ghost_mode[games] = self.GHOST_DISABLED
+        self.ghost_dir[games] = self.NONE
+        self.ghosts_enabled[games] = 0
+        self.activate_timer[games] = 0
+        self.ghost_phase_timer[games] = 0
+
+    def enable_next_ghost(self, games):
+        """Enable the next waiting ghost in each selected game, to leave the ghost house first,
+        starting the scatter and chase phases with the first ghost"""
+        games = games & (self.ghosts_enabled < self.n_ghosts)
+        idx = np.nonzero(games)[0]
+        if not len(idx):
+            return
+        g = self.ghosts_enabled[idx]
+        self.ghost_dir[idx, g] = self.NONE
+        self.ghost_mode[idx, g] = self.GHOST_NORMAL
+        self.ghost_leaving[idx, g] = self.has_house_exit[g]
+        first = idx[g == 0]
+        self.ghost_phase[first] = 0
+        self.ghost_phase_timer[first] = self.phase_steps[0]
+        self.ghosts_enabled[idx] += 1
+        self.activate_timer[idx] = np.where(self.ghosts_enabled[idx] < self.n_ghosts, self.activate_steps, 0)
+
+    def blocked(self, xy, speed, shields=True):
+        """Test rects of block size at positions xy (..., 1, 2) moved by speed in each direction,
+        returning a (..., 4) array which is True where a wall, or optionally a shield, is hit"""
+        bs = self.block_size
+        left = xy[..., 0] + self.DX * speed
+        top = xy[..., 1] + self.DY * speed
+        rows = self.walls.shape[0] - 1
+        cols = self.walls.shape[1] - 1
+        result = np.zeros(left.shape, dtype=bool)
+        for row in (top // bs, (top + bs - 1) // bs):
+            r = np.clip(row + self.PAD, 0, rows)
+            for col in (left // bs, (left + bs - 1) // bs):
+                c = np.clip(col + self.PAD, 0, cols)
+                result |= self.walls[r, c]
+                if shields:     # shields cover only the top left quarter of their tile
+                    result |= self.shields[r, c] & (left < col * bs + bs // 2) & (top < row * bs + bs // 2)
+        return result
+
+    def targets(self):
+        """Vectorized GhostBehavior.target, the tile each ghost heads for as a (n_games, n_ghosts, 2) array"""
+        tile = self.ghost_tile
+        pac = (self.pac_xy[:, ::-1] // self.block_size)[:, None, :]
+        facing = np.where((self.pac_dir != self.NONE)[:, None], self.STEPS[np.clip(self.pac_dir, 0, 3)], 0)[:, None, :]
+        corners = np.broadcast_to(self.corners, tile.shape)
+        leader = tile[:, :1, :]
+        kinds = self.kinds[None, :, None]
+        far = ((pac - tile) ** 2).sum(axis=-1, keepdims=True) > Clyde.SHY_DISTANCE ** 2
+        chase = np.where(kinds == self.PINKY, pac + 4 * facing, pac)
+        chase = np.where(kinds == self.INKY, 2 * (pac + 2 * facing) - leader, chase)
+        chase = np.where((kinds == self.CLYDE) & ~far, corners, chase)
+        return np.where(self.scatter[self.ghost_phase][:, None, None], corners, chase)
+
+    def steer(self, options, target, away=False):
+        """Vectorized ghost_behavior.steer, the option whose next tile is nearest to the target,
+        or furthest from it if moving away, preferring the first direction on ties"""
+        dist = ((self.ghost_tile[..., None, :] + self.STEPS - target[..., None, :]) ** 2).sum(axis=-1)
+        if away:
+            dist = -dist
+        dist = np.where(options, dist, np.iinfo(np.int32).max)
+        return np.where(options.any(axis=-1), dist.argmin(axis=-1), self.NONE)
+
+    def move(self, xy, directions, speed, allowed):
+        """Move positions by speed in their direction wherever allowed"""
+        d = np.clip(directions, 0, 3)
+        xy[..., 0] += np.where(allowed, self.DX[d] * speed, 0).astype(xy.dtype)
+        xy[..., 1] += np.where(allowed, self.DY[d] * speed, 0).astype(xy.dtype)
+
+    def eat(self, mask, offset, games):
+        """Remove at most one item of a kind under PacMan's rect, as with spritecollideany in PacMan.eat"""
+        bs = self.block_size
+        n = np.arange(self.n_games)
+        x, y = self.pac_xy[:, 0], self.pac_xy[:, 1]
+        eaten = np.zeros(self.n_games, dtype=bool)
+        r0, c0 = (y - offset) // bs, (x - offset) // bs
+        for dr, dc in ((0, 0), (0, 1), (1, 0), (1, 1)):
+            r, c = r0 + dr, c0 + dc
+            inside = (r >= 0) & (r < self.rows) & (c >= 0) & (c < self.cols)
+            hit = inside & (np.abs(x - (c * bs + offset)) < bs) & (np.abs(y - (r * bs + offset)) < bs)
+            hit &= mask[n, np.clip(r, 0, self.rows - 1), np.clip(c, 0, self.cols - 1)]
+            hit &= games & ~eaten
+            mask[n[hit], r[hit], c[hit]] = False
+            eaten |= hit
+        return eaten
+
+    def check_player(self, games):
+        """Eat pellets and resolve ghost collisions, as GameState.check_player does"""
+        bs = self.block_size
+        pellet = self.eat(self.pellets, bs // 3, games)
+        fruit = self.eat(self.fruits, bs // 4, games)
+        power = self.eat(self.power_pellets, bs // 3, games)
+        self.score += pellet * 10 + fruit * 20 + power * 20
+        self.fruit_count += fruit
+        turn_blue = power[:, None] & ((self.ghost_mode == self.GHOST_NORMAL) | (self.ghost_mode == self.GHOST_BLUE))
+        self.ghost_mode[turn_blue] = self.GHOST_BLUE
+        self.ghost_since[turn_blue] = self.ticks
+
+        overlap = (np.abs(self.ghost_xy - self.pac_xy[:, None, :]) < bs).all(axis=-1) & games[:, None]
+        hit = overlap.any(axis=1)
+        first = overlap.argmax(axis=1)
+        n = np.arange(self.n_games)
+        mode = self.ghost_mode[n, first]
+        eaten = hit & (mode == self.GHOST_BLUE)
+        self.ghost_mode[n[eaten], first[eaten]] = self.GHOST_RETURN
+        self.ghost_since[n[eaten], first[eaten]] = self.ticks
+        self.score += eaten * 200
+        killed = hit & ~eaten & (mode != self.GHOST_RETURN) & ~self.pac_dead
+        if killed.any():
+            self.lives -= killed
+            self.pac_dead |= killed
+            self.disable_ghosts(killed)
+            self.phase[killed] = self.DYING
+            self.phase_timer[killed] = self.rebuild_steps
+        cleared = ~hit & (self.phase == self.PLAYING) & games
+        cleared &= ~(self.pellets.any(axis=(1, 2)) | self.power_pellets.any(axis=(1, 2)))
+        self.phase[cleared] = self.CLEARED
+        self.phase_timer[cleared] = self.clear_steps
+
+    def decide(self, decide, blue, returning):
+        """Choose the direction of the selected ghosts on the tile they are standing on, with the rules of
+        Ghost.choose"""
+        row, col = self.ghost_tile[..., 0], self.ghost_tile[..., 1]
+        ghost_idx = np.broadcast_to(np.arange(self.n_ghosts), self.ghost_dir.shape)
+        home = self.return_dirs[ghost_idx, row, col]
+        arrived = decide & returning & (home == self.NONE)   # home, or home cannot be reached
+        self.ghost_mode[arrived] = self.GHOST_NORMAL
+        self.ghost_leaving |= arrived & self.has_house_exit
+        leave = self.leave_dirs[ghost_idx, row, col]
+        self.ghost_leaving &= ~(decide & (leave == self.NONE) & ~(returning & ~arrived))
+        options = self.exits[row, col]
+        direction = np.clip(self.ghost_dir, 0, 3)[..., None]
+        keep = np.take_along_axis(options, direction, axis=-1)[..., 0]
+        keep &= (self.ghost_dir != self.NONE) & self.corridors[row, col]
+        forward = options & ~((np.arange(4) == (direction + 2) % 4) & (self.ghost_dir != self.NONE)[..., None])
+        options = np.where(forward.any(axis=-1, keepdims=True), forward, options)    # only turn back at dead ends
+        roam = np.where(blue, self.steer(options, self.pac_xy[:, None, ::-1] // self.block_size, away=True),
+                        self.steer(options, self.targets()))
+        pick = np.where(keep, self.ghost_dir, roam)
+        pick = np.where(self.ghost_leaving, leave, pick)
+        pick = np.where(returning & ~arrived, home, pick)
+        self.ghost_dir = np.where(decide, pick, self.ghost_dir).astype(np.int8)
+        self.ghost_progress[decide & (self.ghost_dir == self.NONE)] = 0
+
+    def update_ghosts(self, games):
+        """Move every enabled ghost, with the rules of Ghost.update_normal, update_blue and update_return,
+        choosing a direction only on reaching a tile or when standing still"""
+        bs = self.block_size
+        mode = self.ghost_mode
+        active = games[:, None] & (mode != self.GHOST_DISABLED)
+        elapsed = self.ticks - self.ghost_since
+        blue = active & (mode == self.GHOST_BLUE)
+        returning = active & (mode == self.GHOST_RETURN)
+        moving = (active & (mode == self.GHOST_NORMAL)) | blue | (returning & (elapsed > self.return_delay_steps))
+
+        self.decide(moving & (self.ghost_dir == self.NONE), blue, returning)
+        moving &= self.ghost_dir != self.NONE
+        self.ghost_progress += np.where(moving, self.ghost_speeds[:, None], 0).astype(np.int32)
+        reached = moving & (self.ghost_progress >= bs)
+        d = np.clip(self.ghost_dir, 0, 3)
+        self.ghost_tile[..., 0] += np.where(reached, self.DY[d], 0).astype(np.int32)
+        self.ghost_tile[..., 1] += np.where(reached, self.DX[d], 0).astype(np.int32)
+        self.ghost_progress -= np.where(reached, bs, 0).astype(np.int32)
+        self.decide(reached, blue, returning)
+        self.place_ghosts(active)
+
+        if self.teleports is not None:
+            boosted = games & (self.level > 3)
+            for src, dst, shift in ((0, 1, -bs), (1, 0, bs)):
+                touching = boosted[:, None] & (np.abs(self.ghost_xy - self.teleports[src]) < bs).all(axis=-1)
+                self.ghost_xy[touching] = self.teleports[dst] + np.array([shift, 0])
+                self.ghost_tile[touching] = self.ghost_xy[touching][:, ::-1] // bs    # Ghost.align
+                self.ghost_progress[touching] = 0
+                self.ghost_dir[touching] = self.NONE
+                self.place_ghosts(touching)
+
+    def place_ghosts(self, ghosts):
+        """Set the position of the selected ghosts from the tile they last reached and how far they have moved on"""
+        d = np.clip(self.ghost_dir, 0, 3)
+        progress = np.where(self.ghost_dir == self.NONE, 0, self.ghost_progress)
+        x = self.ghost_tile[..., 1] * self.block_size + self.DX[d] * progress
+        y = self.ghost_tile[..., 0] * self.block_size + self.DY[d] * progress
+        self.ghost_xy[..., 0] = np.where(ghosts, x, self.ghost_xy[..., 0])
+        self.ghost_xy[..., 1] = np.where(ghosts, y, self.ghost_xy[..., 1])
+
+    def update_player(self, games):
+        """Move PacMan where the requested direction is not blocked, as in PacMan.update"""
+        moving = games & self.pac_moving & (self.pac_dir != self.NONE) & ~self.pac_dead
+        blocked = self.blocked(self.pac_xy[:, None, :], self.pac_speed)
+        clear = ~np.take_along_axis(blocked, np.clip(self.pac_dir, 0, 3)[:, None].astype(np.intp), axis=1)[:, 0]
+        self.move(self.pac_xy, self.pac_dir, self.pac_speed, moving & clear)
+
+    def step(self, actions=None):
+        """Advance every game by one step and return the score gained by each,
+        actions hold a direction per game, or NONE to release the keys"""
+        if actions is not None:
+            actions = np.asarray(actions)
+            pressed = actions != self.NONE
+            self.pac_dir[pressed] = actions[pressed]
+            self.pac_moving = pressed
+        score = self.score.copy()
+        self.ticks += 1
+
+        expired = (self.ghost_mode == self.GHOST_BLUE) & (self.ticks - self.ghost_since > self.blue_steps)
+        self.ghost_mode[expired] = self.GHOST_NORMAL   # Ghost.end_blue_state, due before anything else moves
+
+        self.activate_timer -= self.activate_timer > 0
+        self.enable_next_ghost((self.activate_timer == 0) & (self.ghosts_enabled > 0))
+        switch = self.ghost_phase_timer == 1
+        self.ghost_phase_timer -= self.ghost_phase_timer > 0
+        self.ghost_phase[switch] = np.minimum(self.ghost_phase[switch] + 1, len(self.phase_steps) - 1)
+        self.ghost_phase_timer[switch] = self.phase_steps[self.ghost_phase[switch]]
+        waiting = self.phase != self.PLAYING
+        self.phase_timer -= waiting
+        due = waiting & (self.phase_timer <= 0)
+        started = due & (self.phase == self.TRANSITION)
+        self.phase[started] = self.PLAYING
+        self.enable_next_ghost(started)
+        next_level = due & (self.phase == self.CLEARED)
+        self.level += next_level
+        respawn = (due & (self.phase == self.DYING)) | next_level
+        self.phase[respawn & (self.lives <= 0)] = self.OVER
+        self.rebuild(respawn & (self.lives > 0))
+
+        live = (self.phase == self.PLAYING) | (self.phase == self.DYING) | (self.phase == self.CLEARED)
+        live &= ~started    # the step ending a transition only enables the first ghost
+        self.check_player(live)
+        self.ghost_speeds[self.level > 3] = self.block_size   # Ghost.increase_speed
+        self.update_ghosts(live & (self.phase != self.CLEARED))
+        self.update_player(live & (self.phase == self.PLAYING))
+        return self.score - score
+
+    @property
+    def done(self):
+        """Boolean mask of the games which are over"""
+        return self.phase == self.OVER
@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+from time import perf_counter
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame   # noqa: E402 - the drivers must be chosen before pygame is imported
+from asset_cache import AssetCache  # noqa: E402
+from atlas import Atlas  # noqa: E402
+from game_state import GameState    # noqa: E402
+from image_manager import ImageManager  # noqa: E402
+from renderer import DirtyRectRenderer  # noqa: E402
+
+
+class Benchmark:
+    """Times the game's hot paths on a headless display, so results can be compared between changes"""
+    DIRECTION_KEYS = [pygame.K_LEFT, pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN]
+
+    def __init__(self, repeat=5, pairs=2000, frames=600, seed=0):
+        self.repeat = repeat    # timing rounds per case, the best and median round are reported
+        self.pairs = pairs      # tile pairs to path find between, 0 for all pairs
+        self.frames = frames
+        self.seed = seed
+        self.cases = {'build_maze': self.bench_build_maze,
+                      'find_path': self.bench_find_path,
+                      'ghost_update': self.bench_ghost_update,
+                      'is_blocked': self.bench_is_blocked,
+                      'eat': self.bench_eat,
+                      'image_manager_cold': self.bench_image_manager_cold,
+                      'image_manager_warm': self.bench_image_manager_warm,
+                      'frame': self.bench_frame}
+        self.screen = None
+        self.state = None
+        self.renderer = None
+
+    def setup(self):
+        """Create a game state on the dummy display, as the real game would on a window, but without saving
+        scores or scaled images to disk so that every run loads the same way and leaves no files behind"""
+        pygame.init()
+        if self.state is None:
+            AssetCache.disk_dir = None
+            self.screen = pygame.display.set_mode(GameState.SCREEN_SIZE)
+            self.state = self.new_state()
+            self.renderer = DirtyRectRenderer(self.screen)
+        return self.state
+
+    def new_state(self):
+        """Return a game state which loads every level on this thread, so no loader thread runs while timing"""
+        return GameState(self.screen, maze_map_file='maze_map.txt', background_loading=False)
+
+    def time(self, func, number, setup=None):
+        """Return the best and median time in microseconds of one call, over repeated rounds of calls,
+        calling setup untimed before each round"""
+        rounds = []
+        for _ in range(self.repeat):
+            if setup:
+                setup()
+            start = perf_counter()
+            for _ in range(number):
+                func()
+            rounds.append((perf_counter() - start) / number * 1e6)
+        return {'best_us': min(rounds), 'median_us': statistics.median(rounds), 'calls': number}
+
+    def bench_build_maze(self):
+        maze = self.setup().maze
+        return self.time(maze.build_maze, 50)
+
+    def bench_find_path(self):
+        path_finder = self.setup().maze.path_finder
+        tiles = [(row, col) for row in range(path_finder.rows) for col in range(path_finder.cols)
+                 if path_finder.is_open(row, col)]
+        if self.pairs:
+            rand = random.Random(self.seed)
+            pairs = [(rand.choice(tiles), rand.choice(tiles)) for _ in range(self.pairs)]
+        else:
+            pairs = [(start, target) for start in tiles for target in tiles]
+        it = iter(())
+
+        def find():
+            nonlocal it
+            try:
+                start, target = next(it)
+            except StopIteration:
+                it = iter(pairs)
+                start, target = next(it)
+            path_finder.find_path(start, target)
+        return self.time(find, len(pairs))
+
+    def bench_ghost_update(self):
+        """Time every ghost choosing and moving in one step, as they chase around the maze"""
+        ghosts = list(self.setup().ghosts)
+        for g in ghosts:
+            g.enable()
+        result = self.time(lambda: [g.update() for g in ghosts], 1000)
+        for g in ghosts:
+            g.disable()
+            g.reset_position()
+        return result
+
+    def bench_is_blocked(self):
+        player = self.setup().player
+        player.reset_position()
+        player.direction, player.moving = 'l', True
+        result = self.time(player.is_blocked, 10000)
+        player.direction, player.moving = None, False
+        return result
+
+    def bench_eat(self):
+        state = self.setup()
+        maze, player = state.maze, state.player
+        path_finder = maze.path_finder
+        positions = [maze.tile_position((row, col), maze.block_size // 2)   # the center of every open tile
+                     for row in range(path_finder.rows) for col in range(path_finder.cols)
+                     if path_finder.is_open(row, col)]
+        random.Random(self.seed).shuffle(positions)     # visit tiles, with or without items, in no particular order
+        it = iter(())
+
+        def restore():
+            nonlocal it
+            maze.build_maze()
+            it = iter(positions)
+
+        def eat():
+            player.rect.center = next(it)
+            player.eat()
+        result = self.time(eat, len(positions), setup=restore)
+        maze.build_maze()
+        player.reset_position()
+        return result
+
+    def bench_image_manager_cold(self):
+        self.setup()
+
+        def create():
+            AssetCache.clear()
+            Atlas.clear()
+            ImageManager('pacman-horiz.png', sheet=True, pos_offsets=[(0, 0, 32, 32), (32, 0, 32, 32),
+                                                                      (0, 32, 32, 32), (32, 32, 32, 32),
+                                                                      (0, 64, 32, 32)],
+                         resize=(10, 10), reversible=True)
+        return self.time(create, 50)
+
+    def bench_image_manager_warm(self):
+        self.setup()
+        return self.time(lambda: ImageManager('pacman-horiz.png', sheet=True,
+                                              pos_offsets=[(0, 0, 32, 32), (32, 0, 32, 32), (0, 32, 32, 32),
+                                                           (32, 32, 32, 32), (0, 64, 32, 32)],
+                                              resize=(10, 10), reversible=True), 500)
+
+    def bench_frame(self):
+        """Play a scripted game from the end of its opening transition, turning every half second,
+        timing whole frames of a simulation step and drawing"""
+        self.setup()
+        frame = 0
+
+        def reset():
+            nonlocal frame
+            frame = 0
+            self.state.close()
+            self.state = self.new_state()
+            self.state.start_game()
+            while self.state.level_transition.transition_show:  # time play, not the opening transition
+                self.state.step()
+            self.renderer.invalidate()
+            self.renderer.draw_state(self.state)    # bake the maze background, so rounds time only updates
+
+        def update():
+            nonlocal frame
+            inputs = []
+            if frame % 30 == 0:
+                key = Benchmark.DIRECTION_KEYS[(frame // 30) % len(Benchmark.DIRECTION_KEYS)]
+                inputs.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+            self.state.step(inputs)
+            if not self.renderer.draw_state(self.state):
+                self.renderer.invalidate()  # the level transition covers the maze
+            frame += 1
+        return self.time(update, self.frames, setup=reset)
+
+    def run(self, names=None):
+        """Run the named cases, or every case, and return the results with a description of the machine"""
+        results = {}
+        for name in names or self.cases:
+            results[name] = self.cases[name]()
+        return {'machine': {'python': platform.python_version(), 'pygame': pygame.version.ver,
+                            'platform': platform.platform()},
+                'settings': {'repeat': self.repeat, 'pairs': self.pairs, 'frames': self.frames, 'seed': self.seed},
+                'results': results}
+
+    @staticmethod
+    def compare(results, baseline, tolerance):
+        """Return the ratio of each case's best time to the baseline's, and the cases slower than tolerance allows"""
+        ratios = {}
+        regressions = []
+        for name, result in results['results'].items():
+            base = baseline['results'].get(name)
+            if base:
+                ratios[name] = result['best_us'] / base['best_us']
+                if ratios[name] > 1 + tolerance:
+                    regressions.append(name)
+        return ratios, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the PacMan Portal hot paths on a headless display')
+    parser.add_argument('cases', nargs='*', help='cases to run, all by default')
+    parser.add_argument('--output', '-o', metavar='PATH', help='write the results to PATH as JSON')
+    parser.add_argument('--baseline', '-b', metavar='PATH', help='compare against results saved with --output')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='fraction slower than the baseline reported as a regression (default 0.1)')
+    parser.add_argument('--repeat', type=int, default=5, help='timing rounds per case (default 5)')
+    parser.add_argument('--pairs', type=int, default=2000,
+                        help='random tile pairs for find_path, 0 for every pair of open tiles (default 2000)')
+    parser.add_argument('--frames', type=int, default=600, help='frames per round of the frame case (default 600)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    bench = Benchmark(repeat=args.repeat, pairs=args.pairs, frames=args.frames, seed=args.seed)
+    unknown = [name for name in args.cases if name not in bench.cases]
+    if unknown:
+        parser.error('unknown cases: {}, choose from {}'.format(', '.join(unknown), ', '.join(bench.cases)))
+    random.seed(args.seed)  # the maze's fruit placement
+    results = bench.run(args.cases)
+
+    ratios, regressions = {}, []
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        ratios, regressions = Benchmark.compare(results, baseline, args.tolerance)
+    for name, result in results['results'].items():
+        line = '{:<24}{:>12.2f} us  median {:>10.2f} us'.format(name, result['best_us'], result['median_us'])
+        if name in ratios:
+            line += '  x{:.2f} baseline{}'.format(ratios[name], '  REGRESSION' if name in regressions else '')
+        print(line)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,20 +3,46 @@ from sys import exit
 
 
 class EventLoop:
-    """Contains the logic for checking events in a game loop"""
-    def __init__(self, loop_running=False, actions=None):
-        self.action_map = {pygame.QUIT: exit, }
-        if isinstance(actions, dict):
-            self.action_map.update(actions)     # add custom actions, if provided
+    """Contains the logic for checking events in a game loop. Handlers are registered up front as taking the event
+    or taking nothing, only event types with a handler are let into pygame's queue while the loop checks events,
+    and mouse motion is coalesced so only the latest position in each check is handled"""
+    COALESCED = frozenset((pygame.MOUSEMOTION,))   # event types where only the latest event matters
+    filtering = None    # the loop whose event types the queue currently lets through
+
+    def __init__(self, loop_running=False, actions=None, commands=None):
+        self.handlers = {}  # event type -> (handler, True if the handler takes the event)
+        self.register(pygame.QUIT, exit, takes_event=False)
+        for event_type, handler in (actions or {}).items():    # handlers taking the event
+            self.register(event_type, handler)
+        for event_type, handler in (commands or {}).items():   # handlers taking no arguments
+            self.register(event_type, handler, takes_event=False)
         self.loop_running = loop_running
 
+    def register(self, event_type, handler, takes_event=True):
+        """Handle an event type, calling the handler with the event or with no arguments"""
+        self.handlers[event_type] = (handler, takes_event)
+        if EventLoop.filtering is self:
+            EventLoop.filtering = None  # let the new event type in on the next check
+
+    def filter_events(self):
+        """Block every event type this loop has no handler for from pygame's queue"""
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(self.handlers))
+        EventLoop.filtering = self
+
     def check_events(self):
         """Check events to see if any match mapped actions"""
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.action_map[event.type]()   # quit game with no argument passed
-            elif event.type in self.action_map:
-                try:
-                    self.action_map[event.type](event)    # execute events from map
-                except TypeError:
-                    self.action_map[event.type]()   # event function may not accept any parameters
+        if EventLoop.filtering is not self:
+            self.filter_events()
+        events = pygame.event.get()
+        latest = {event.type: event for event in events if event.type in EventLoop.COALESCED}
+        for event in events:
+            if latest and latest.get(event.type, event) is not event:
+                continue    # superseded by a later event of the same type
+            entry = self.handlers.get(event.type)   # events queued before filtering may have no handler
+            if entry:
+                handler, takes_event = entry
+                if takes_event:
+                    handler(event)
+                else:
+                    handler()
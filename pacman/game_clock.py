@@ -0,0 +1,28 @@
+import pygame
+
+
+class SystemClock:
+    """Reports real elapsed time from pygame, for code that runs in real time"""
+    @staticmethod
+    def get_ticks():
+        """Return the number of milliseconds since pygame was initialized"""
+        return pygame.time.get_ticks()
+
+
+class StepClock:
+    """A clock which only moves forward when advanced, so simulations can run at any speed"""
+    def __init__(self, step_ms=1000 / 60):
+        self.step_ms = step_ms
+        self.steps = 0
+
+    def advance(self, steps=1):
+        """Move the clock forward by a number of fixed steps"""
+        self.steps += steps
+
+    def reset(self):
+        """Move the clock back to zero"""
+        self.steps = 0
+
+    def get_ticks(self):
+        """Return the number of simulated milliseconds that have passed"""
+        return int(self.steps * self.step_ms)
@@ -0,0 +1,283 @@
+import os
+import random
+from functools import partial
+import pygame
+from ghost import Ghost, GhostState
+from ghost_behavior import PERSONALITIES, PhaseSchedule
+from layout import ScreenLayout
+from level_pack import LevelPack
+from pacman import PacMan
+from lives_status import PacManCounter
+from score import ScoreController, LevelTransition
+from sound_manager import SoundManager
+from game_clock import StepClock
+from timer_wheel import TimerWheel
+from profiler import NullProfiler
+
+
+class GameState:
+    """Holds the game's actors and rules, and advances them one fixed step at a time
+    independently of any rendering or real time"""
+
+    SCREEN_SIZE = ScreenLayout.DESIGN_SIZE
+    HUD_ROW = 0.965     # height of the score, lives and item displays, as a fraction of the screen
+    STEP_MS = 1000 / 60     # one simulation step per frame at 60 fps
+    START_EVENT = 'start'   # timer names
+    REBUILD_EVENT = 'rebuild'
+    LEVEL_TRANSITION_EVENT = 'level_transition'
+    GHOST_PHASE_EVENT = 'ghost_phase'
+    GHOST_RELEASE_MS = 10000    # time over which ghosts are released, at most 2.5 seconds apart
+    GHOST_SOUND_FILES = ['RunForestRun.wav', 'Eaten3.wav', 'babySharkPacman.wav']
+    SOUND_FILES = PacMan.SOUND_FILES + GHOST_SOUND_FILES + LevelTransition.SOUND_FILES   # every sound of a game
+
+    def __init__(self, screen, maze_map_file='maze_map.txt', clock=None, profiler=None, background_loading=True,
+                 score_store=None, ghost_count=None):
+        self.screen = screen
+        self.clock = clock or StepClock(GameState.STEP_MS)
+        self.timer_wheel = TimerWheel(self.clock)   # deadlines of the game and its actors, ticked every step
+        self.profiler = profiler or NullProfiler()
+        self.layout = ScreenLayout.of(screen)
+        self.score_keeper = ScoreController(screen=self.screen,
+                                            sb_pos=self.layout.at(1 / 5, GameState.HUD_ROW),
+                                            items_image='cherry.png',
+                                            itc_pos=self.layout.at(0.6, GameState.HUD_ROW),
+                                            score_store=score_store)
+        self.level_pack = LevelPack(maze_map_file, background=background_loading)   # a map, or a map per level
+        self.maze = self.level_pack.create_maze(self.screen, level=1)
+        self.next_layout = None     # future of the layout for the level about to start, if its map differs
+        self.life_counter = PacManCounter(screen=self.screen, ct_pos=self.layout.at(1 / 3, GameState.HUD_ROW),
+                                          images_size=(self.maze.block_size, self.maze.block_size))
+        self.level_transition = LevelTransition(screen=self.screen, score_controller=self.score_keeper,
+                                                timers=self.timer_wheel)
+        self.game_over = True
+        self.pause = False
+        self.player = PacMan(screen=self.screen, maze=self.maze, timers=self.timer_wheel)
+        self.ghosts = pygame.sprite.Group()
+        self.ghost_sound_manager = SoundManager(sound_files=GameState.GHOST_SOUND_FILES,
+                                                keys=['blue', 'eaten', 'std'],
+                                                priority=Ghost.GHOST_AUDIO_PRIORITY)
+        self.ghost_count = ghost_count  # ghosts to play against, one per spawn point in the maze if None
+        self.ghost_phases = PhaseSchedule()
+        self.ghost_active_interval = None   # time between releasing each ghost, set as they spawn
+        self.ghosts_to_activate = None
+        self.first_ghost = None
+        self.other_ghosts = []
+        self.spawn_ghosts()
+        self.timers = {}    # active named timers, mapping timer name to its timer in the wheel
+        self.actions = {GameState.START_EVENT: self.init_ghosts,
+                        GameState.REBUILD_EVENT: self.rebuild_maze,
+                        GameState.LEVEL_TRANSITION_EVENT: self.next_level,
+                        GameState.GHOST_PHASE_EVENT: self.next_ghost_phase}
+        self.on_timer = None    # called with the name of each timer as it fires, such as by a replay log
+
+    @classmethod
+    def headless(cls, maze_map_file='maze_map.txt', clock=None, ghost_count=None):
+        """Create a game state which needs neither a display nor an audio device,
+        loading every level's maze on the calling thread so that runs are reproducible"""
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        pygame.init()
+        return cls(pygame.Surface(GameState.SCREEN_SIZE), maze_map_file=maze_map_file, clock=clock,
+                   background_loading=False, ghost_count=ghost_count)
+
+    def set_timer(self, name, interval):
+        """Fire the named timer repeatedly every interval milliseconds, an interval of 0 disables it"""
+        timer = self.timers.pop(name, None)
+        if timer:
+            timer.cancel()
+        if interval > 0:
+            self.timers[name] = self.timer_wheel.call_after(interval, partial(self.fire_timer, name), interval)
+
+    def fire_timer(self, name):
+        """Run the action of a named timer which is due"""
+        if self.on_timer:
+            self.on_timer(name)
+        self.actions[name]()
+
+    def init_ghosts(self):
+        """kick start the ghost AI over a period of time"""
+        if self.first_ghost is None:
+            return  # the maze has no ghost spawns
+        if not self.first_ghost.state.enabled:
+            self.first_ghost.enable()
+            self.ghosts_to_activate = self.other_ghosts[::-1]   # released in order
+            self.set_timer(GameState.START_EVENT, self.ghost_active_interval)
+            self.ghost_phases.reset()
+            self.set_timer(GameState.GHOST_PHASE_EVENT, self.ghost_phases.duration())
+        else:
+            try:
+                g = self.ghosts_to_activate.pop()
+                g.enable()
+            except IndexError:
+                self.set_timer(GameState.START_EVENT, 0)  # disable timer repeat
+
+    def next_ghost_phase(self):
+        """Switch the ghosts between scattering and chasing"""
+        self.set_timer(GameState.GHOST_PHASE_EVENT, self.ghost_phases.advance())
+
+    def spawn_ghosts(self):
+        """Create all ghosts at the maze's spawn points, sharing them out in turn if there are more ghosts,
+        and giving each the next personality in turn"""
+        spawns = self.maze.ghost_spawn
+        count = len(spawns) if self.ghost_count is None else self.ghost_count
+        for i in range(count if spawns else 0):
+            g = Ghost(screen=self.screen, maze=self.maze, target=self.player, spawn_info=spawns[i % len(spawns)],
+                      sound_manager=self.ghost_sound_manager, timers=self.timer_wheel,
+                      behavior=PERSONALITIES[i % len(PERSONALITIES)], phases=self.ghost_phases,
+                      leader=self.first_ghost)
+            if self.first_ghost is None:
+                self.first_ghost = g    # the first ghost is released first, and leads the others
+            else:
+                self.other_ghosts.append(g)
+            self.ghosts.add(g)
+        self.ghost_active_interval = min(2500, GameState.GHOST_RELEASE_MS // max(count, 1))
+
+    def close(self):
+        """Stop loading levels in the background and close the level pack, once the state is no longer used"""
+        if self.next_layout:
+            self.next_layout.cancel()
+            self.next_layout = None
+        self.level_pack.close()
+
+    def reset(self, seed=None):
+        """Return to the state of a newly created game, reusing the loaded maze and assets,
+        seeding the random number generator first if a seed is given"""
+        if seed is not None:
+            random.seed(seed)
+        for name in list(self.timers):
+            self.set_timer(name, 0)
+        for g in self.ghosts:
+            if g.state.enabled:
+                g.disable()
+            g.reset_speed()
+            g.reset_position()
+        self.ghosts_to_activate = None
+        self.next_layout = None
+        if self.level_pack.map_for(1) != self.maze.map_file:
+            self.swap_maze(self.level_pack.prepare(self.screen, 1))
+        if self.player.dead:
+            self.player.revive()
+        self.player.reset_position()
+        self.player.direction = None
+        self.player.moving = False
+        self.score_keeper.reset_level()
+        self.score_keeper.score = 0
+        self.life_counter.reset_counter()
+        self.maze.build_maze()
+        self.level_transition.transition_show = False
+        self.pause = False
+        self.game_over = True
+
+    def start_game(self):
+        """Begin a new game, showing the level transition first"""
+        self.level_transition.set_show_transition()
+        self.game_over = False
+        if self.player.dead:
+            self.player.revive()
+            self.score_keeper.reset_level()
+            self.life_counter.reset_counter()
+            self.load_level()
+            self.rebuild_maze()
+
+    def next_level(self):
+        """Increment the game level and then continue the game"""
+        self.set_timer(GameState.LEVEL_TRANSITION_EVENT, 0)  # reset timer
+        self.score_keeper.increment_level()
+        self.load_level()
+        self.rebuild_maze()
+
+    def load_level(self):
+        """Start loading the map for the current level in the background, if it uses a different map"""
+        level = self.score_keeper.level
+        if self.level_pack.map_for(level) != self.maze.map_file:
+            self.next_layout = self.level_pack.prefetch(level)
+        else:
+            self.next_layout = None
+
+    def swap_maze(self, maze):
+        """Play in a different maze, building it and placing PacMan and new ghosts at its spawn points"""
+        maze.build_maze()
+        self.maze = maze
+        self.player.set_maze(maze)
+        self.ghosts.empty()
+        self.first_ghost = None
+        self.other_ghosts = []
+        self.spawn_ghosts()
+
+    def rebuild_maze(self):
+        """Resets the maze to its initial state if the game is still active"""
+        if self.life_counter.lives > 0:
+            for g in self.ghosts:
+                if g.state.enabled:
+                    g.disable()
+            self.maze.build_maze()
+            self.player.reset_position()
+            for g in self.ghosts:
+                g.reset_position()
+            if self.player.dead:
+                self.player.revive()
+            if self.pause:
+                self.pause = False
+            self.level_transition.set_show_transition()
+        else:
+            self.game_over = True
+        self.set_timer(GameState.REBUILD_EVENT, 0)    # disable timer repeat
+
+    def check_player(self):
+        """Check the player to see if they have been hit by an enemy, or if they have consumed pellets/fruit"""
+        n_score, n_fruits, power = self.player.eat()
+        self.score_keeper.add_score(score=n_score, items=n_fruits if n_fruits > 0 else None)
+        if power:
+            for g in self.ghosts:
+                g.begin_blue_state()
+        ghost_collide = pygame.sprite.spritecollideany(self.player, self.ghosts)
+        if ghost_collide and ghost_collide.state.mode == GhostState.BLUE:
+            ghost_collide.set_eaten()
+            self.score_keeper.add_score(200)
+        elif ghost_collide and not (self.player.dead or ghost_collide.state.mode == GhostState.RETURN):
+            self.life_counter.decrement()
+            self.player.set_death()
+            for g in self.ghosts:
+                if g.state.enabled:   # disable any ghosts
+                    g.disable()
+            self.set_timer(GameState.START_EVENT, 0)  # cancel start event
+            self.set_timer(GameState.GHOST_PHASE_EVENT, 0)
+            self.set_timer(GameState.REBUILD_EVENT, 4000)
+        elif not self.maze.pellets_left() and not self.pause:
+            pygame.mixer.stop()
+            self.pause = True
+            self.set_timer(GameState.LEVEL_TRANSITION_EVENT, 1000)
+
+    def step(self, inputs=()):
+        """Advance the simulation by one fixed step, applying the given key events to the player first"""
+        for event in inputs:
+            if event.type in self.player.event_map:
+                self.player.event_map[event.type](event)
+        self.clock.advance()
+        self.timer_wheel.tick()
+        if not self.level_transition.transition_show:
+            with self.profiler.section('check_player'):
+                self.check_player()
+            if not self.pause:
+                with self.profiler.section('ghosts.update'):
+                    self.ghosts.update()
+                with self.profiler.section('player.update'):
+                    self.player.update()
+            for g in self.ghosts:
+                if self.score_keeper.level > 3:
+                    if not g.state.speed_boost:
+                        g.increase_speed()
+                    if self.maze.teleport and self.maze.teleport.check_teleport(g.rect):    # teleport ghosts
+                        g.align()
+        elif self.player.dead:
+            self.player.update()
+        else:
+            if self.next_layout and self.next_layout.done():     # hidden behind the transition
+                self.swap_maze(self.level_pack.prepare(self.screen, self.score_keeper.level,
+                                                       self.next_layout.result()))
+                self.next_layout = None
+            if not self.next_layout:    # hold the transition until the next level's map is loaded
+                self.level_transition.update()
+                # if transition just finished, init ghosts
+                if not self.level_transition.transition_show:
+                    self.init_ghosts()
@@ -0,0 +1,122 @@
+from pathfinding import PathFinder
+
+
+SCATTER = 'scatter'     # ghost phases
+CHASE = 'chase'
+
+
+def steer(tile, options, target, away=False):
+    """Return the option whose next tile is nearest to the target, or furthest from it if moving away,
+    preferring up, left, down then right on ties as the arcade game does"""
+    best = None
+    best_dist = None
+    for d in options:
+        dr, dc = PathFinder.STEPS[d]
+        dist = (tile[0] + dr - target[0]) ** 2 + (tile[1] + dc - target[1]) ** 2
+        if away:
+            dist = -dist
+        if best is None or dist < best_dist:
+            best, best_dist = d, dist
+    return best
+
+
+def ahead(tile, direction, n):
+    """Return the tile n steps ahead of a tile in the given direction, or the tile itself if there is none"""
+    if direction is None:
+        return tile
+    dr, dc = PathFinder.STEPS[direction]
+    return tile[0] + dr * n, tile[1] + dc * n
+
+
+class PhaseSchedule:
+    """Switches every ghost between scattering to its corner and chasing PacMan, after the times
+    of the arcade game's first level, chasing for good once the schedule runs out"""
+    PHASES = ((SCATTER, 7000), (CHASE, 20000), (SCATTER, 7000), (CHASE, 20000),
+              (SCATTER, 5000), (CHASE, 20000), (SCATTER, 5000), (CHASE, 0))   # phase, milliseconds
+
+    def __init__(self, phases=PHASES):
+        self.phases = phases
+        self.index = 0
+
+    @property
+    def phase(self):
+        """The current phase, SCATTER or CHASE"""
+        return self.phases[self.index][0]
+
+    def duration(self):
+        """Return how long the current phase lasts in milliseconds, 0 if it lasts forever"""
+        return self.phases[self.index][1]
+
+    def reset(self):
+        """Go back to the first phase"""
+        self.index = 0
+
+    def advance(self):
+        """Move on to the next phase, returning its duration"""
+        self.index = min(self.index + 1, len(self.phases) - 1)
+        return self.duration()
+
+
+class GhostBehavior:
+    """How a ghost picks the tile it heads for at each junction. Subclasses are the arcade game's personalities,
+    each with a sprite and a corner of the maze to scatter to, given as (row, col) with 0 for the top or left
+    and 1 for the bottom or right"""
+    IMAGE = 'ghost-red.png'
+    CORNER = (0, 1)
+
+    def scatter_target(self, ghost):
+        """Return a tile just beyond the ghost's corner of the maze"""
+        maze = ghost.maze
+        return (maze.grid_rows if self.CORNER[0] else -1), (maze.grid_cols if self.CORNER[1] else -1)
+
+    def chase_target(self, ghost):
+        """Return the tile to head for while chasing"""
+        return ghost.target.tile
+
+    def target(self, ghost):
+        """Return the tile to head for in the current phase"""
+        if ghost.phases and ghost.phases.phase == SCATTER:
+            return self.scatter_target(ghost)
+        return self.chase_target(ghost)
+
+
+class Blinky(GhostBehavior):
+    """Chases PacMan's own tile"""
+    IMAGE = 'ghost-red.png'
+    CORNER = (0, 1)
+
+
+class Pinky(GhostBehavior):
+    """Heads four tiles ahead of PacMan, to cut him off"""
+    IMAGE = 'ghost-pink.png'
+    CORNER = (0, 0)
+
+    def chase_target(self, ghost):
+        return ahead(ghost.target.tile, ghost.target.direction, 4)
+
+
+class Inky(GhostBehavior):
+    """Heads for the point two tiles ahead of PacMan, mirrored from the leading ghost, to trap him between them"""
+    IMAGE = 'ghost-lblue.png'
+    CORNER = (1, 1)
+
+    def chase_target(self, ghost):
+        row, col = ahead(ghost.target.tile, ghost.target.direction, 2)
+        leader = ghost.leader.tile if ghost.leader else ghost.tile
+        return 2 * row - leader[0], 2 * col - leader[1]
+
+
+class Clyde(GhostBehavior):
+    """Chases PacMan's tile from afar, but retreats to his corner within eight tiles of him"""
+    IMAGE = 'ghost-orange.png'
+    CORNER = (1, 0)
+    SHY_DISTANCE = 8
+
+    def chase_target(self, ghost):
+        tile = ghost.target.tile
+        if (tile[0] - ghost.tile[0]) ** 2 + (tile[1] - ghost.tile[1]) ** 2 > Clyde.SHY_DISTANCE ** 2:
+            return tile
+        return self.scatter_target(ghost)
+
+
+PERSONALITIES = (Blinky(), Pinky(), Inky(), Clyde())    # given out in turn, the first ghost leads the others
@@ -1,52 +1,89 @@
-import pygame
+from asset_cache import AssetCache
+from atlas import Atlas
 
 
 class ImageManager:
     """Provides methods and logic for managing a pygame image or sprite sheet"""
+
     def __init__(self, img, sheet=False, pos_offsets=None,
                  resize=None, keys=None,
                  convert=True, transparency=True,
                  animation_delay=None, reversible=False,
-                 repeat=True):
-        if not sheet:
-            self.images = [pygame.image.load('images/' + img)]  # single image
-        else:
-            self.sheet = pygame.image.load('images/' + img)
-            self.pos_offsets = pos_offsets  # get images from sprite sheet, using offsets
-            self.images = self.extract_images()
-        if resize:  # apply resizing
-            self.images = [pygame.transform.scale(img, resize) for img in self.images]
-        self.rect = self.images[0].get_rect()
-        if convert:
-            self.images = [img.convert() for img in self.images]
-        if transparency:
-            for i in self.images:
-                i.set_colorkey((0, 0, 0, 0))
-        if keys:    # if keys provided, use keys instead of index value for getting images
-            if not len(keys) == len(self.images):
-                raise ValueError('Must provide same number of keys as images')
-            images_dict = dict()
-            for k, i in zip(keys, range(len(self.images))):
-                images_dict[k] = self.images[i]
-            self.images = images_dict
-        else:
-            self.image_index = 0
+                 repeat=True, timers=None, directions=None):
+        self.img = img
+        self.sheet = sheet
+        self.pos_offsets = pos_offsets  # get images from sprite sheet, using offsets
+        self.resize = resize
+        self.convert = convert
+        self.keys = keys
+        self.transparency = transparency
+        # orientation for each movement direction, e.g. {'l': (True, False)} for a sheet facing right
+        self.directions = dict(directions or {})
+        self.orientations = {}  # image sets flipped as needed, keyed by (x flip, y flip)
+        for flip in dict.fromkeys(((False, False), *self.directions.values())):  # others flipped on first use
+            self.load_orientation(flip)
+        self.orientation = (False, False)
+        self.images = self.orientations[self.orientation]
+        self.rect = next(iter(self.images.values()) if keys else iter(self.images)).get_rect()
+        self.image_index = 0
+        self.reversed = False   # reversible animations play their frames backwards after reaching the end
         self.animation_delay = animation_delay
-        self.time_stamp = pygame.time.get_ticks()
+        self.timers = timers    # timer wheel pacing the animation, frames change on every call without one
+        self.frame_due = True
+        if animation_delay and timers:
+            self.schedule_frame()
         self.reversible = reversible
         self.repeat = repeat
 
+    def load_orientation(self, flip):
+        """Load the images flipped to an orientation and pack them into the atlas, returning them"""
+        if not self.sheet:
+            images = [AssetCache.image(self.img, resize=self.resize, convert=self.convert, flip=flip)]
+        else:
+            images = self.extract_images(flip)
+        if self.transparency:
+            for i in images:
+                i.set_colorkey((0, 0, 0, 0))
+        rects = self.pos_offsets if self.sheet else [None]
+        images = [Atlas.pack((self.img, tuple(rect) if rect else None, tuple(self.resize) if self.resize else None,
+                              flip, self.convert, self.transparency), i) for rect, i in zip(rects, images)]
+        if self.keys:   # if keys provided, use keys instead of index value for getting images
+            if not len(self.keys) == len(images):
+                raise ValueError('Must provide same number of keys as images')
+            images = dict(zip(self.keys, images))
+        self.orientations[flip] = images
+        return images
+
+    def orientation_images(self, flip):
+        """Return the images flipped to an orientation, flipping them the first time they are needed"""
+        images = self.orientations.get(flip)
+        return images if images is not None else self.load_orientation(flip)
+
+    def set_orientation(self, x_bool=False, y_bool=False):
+        """Switch to the images for the given orientation"""
+        self.orientation = (x_bool, y_bool)
+        self.images = self.orientation_images(self.orientation)
+
+    def set_direction(self, direction):
+        """Switch to the pre-flipped images registered for a movement direction"""
+        self.set_orientation(*self.directions[direction])
+
+    def direction_images(self, direction):
+        """Return the pre-flipped images registered for a movement direction"""
+        return self.orientations[self.directions[direction]]
+
     def flip(self, x_bool=True, y_bool=False):
         """Flip images in the y, x, or both directions"""
-        if isinstance(self.images, dict):
-            self.images = {v: pygame.transform.flip(v, x_bool, y_bool) for k, v in self.images.items()}
-        else:
-            self.images = [pygame.transform.flip(x, x_bool, y_bool) for x in self.images]
+        self.set_orientation(self.orientation[0] != x_bool, self.orientation[1] != y_bool)
+
+    def current_index(self):
+        """Return the list index of the current image, accounting for reversed playback"""
+        return len(self.images) - 1 - self.image_index if self.reversed else self.image_index
 
     def get_image(self, key=None):
         """Returns image information that is useful for displaying the image"""
         if isinstance(self.images, list):
-            return self.images[self.image_index], self.rect
+            return self.images[self.current_index()], self.rect
         else:
             if not key:
                 raise KeyError('No image key provided')
@@ -61,26 +98,35 @@ class ImageManager:
         if not isinstance(self.images, list):
             raise ValueError('next_image not callable when using keys')
         if not self.repeat and self.image_index + 1 >= len(self.images):
-            return self.images[self.image_index]
+            return self.images[self.current_index()]
         if self.reversible and self.image_index + 1 >= len(self.images):
-            self.images.reverse()
-        if not self.animation_delay:
+            self.reversed = not self.reversed
+        if not (self.animation_delay and self.timers):
             self.image_index = (self.image_index + 1) % len(self.images)
-        else:
-            if abs(self.time_stamp - pygame.time.get_ticks()) > self.animation_delay:
-                self.image_index = (self.image_index + 1) % len(self.images)
-                self.time_stamp = pygame.time.get_ticks()
+        elif self.frame_due:
+            self.image_index = (self.image_index + 1) % len(self.images)
+            self.schedule_frame()
+
+        return self.images[self.current_index()]
+
+    def schedule_frame(self):
+        """Wait until more than the animation delay has passed before moving on to the next image"""
+        self.frame_due = False
+        self.timers.call_after(self.animation_delay + 1, self.set_frame_due)
+
+    def set_frame_due(self):
+        """Let the next call to next_image move on to the next image"""
+        self.frame_due = True
 
-        return self.images[self.image_index]
+    def overlaid(self, overlays):
+        """Return this manager's frames with each of another manager's keyed images drawn over them, as a
+        dictionary of frame lists with the same keys, composited and packed into the atlas once"""
+        return {key: [Atlas.composite((id(frame), id(overlay)), frame, overlay) for frame in self.images]
+                for key, overlay in overlays.images.items()}   # packed frames live on, so their ids are unique
 
-    def extract_images(self):
+    def extract_images(self, flip=(False, False)):
         """Extract a list of images from their respective positions and offsets in a sprite sheet"""
         if not self.sheet:
             raise ValueError('Image manager has no sprite sheet to extract images from')
-        result = []
-        for rect in self.pos_offsets:
-            select = pygame.Rect(rect)
-            sub_image = pygame.Surface(select.size).convert(pygame.display.get_surface())
-            sub_image.blit(self.sheet, (0, 0), select)
-            result.append(sub_image)
-        return result
+        return [AssetCache.image(self.img, rect=rect, resize=self.resize, convert=self.convert, flip=flip)
+                for rect in self.pos_offsets]
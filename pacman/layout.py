@@ -0,0 +1,56 @@
+class ScreenLayout:
+    """Where the game sits on a screen of any size. The game is laid out for an 800x600 screen with 10 pixel tiles,
+    and is scaled to the largest whole tile size whose design area fits the screen, centred on it. All conversions
+    between maze tiles and screen positions go through here"""
+    DESIGN_SIZE = (800, 600)
+    DESIGN_BLOCK = 10
+    MIN_BLOCK = 4
+    MAZE_ORIGIN = (1 / 5, 1 / 12)    # the maze's top left corner, as a fraction of the design area
+    layouts = {}    # shared layouts, keyed by screen size
+
+    def __init__(self, screen_size, block_size=None):
+        self.screen_size = tuple(screen_size)
+        self.block_size = block_size or ScreenLayout.fit_block_size(screen_size)
+        self.scale = self.block_size / ScreenLayout.DESIGN_BLOCK
+        self.width = int(ScreenLayout.DESIGN_SIZE[0] * self.scale)  # the design area, scaled
+        self.height = int(ScreenLayout.DESIGN_SIZE[1] * self.scale)
+        self.left = (self.screen_size[0] - self.width) // 2
+        self.top = (self.screen_size[1] - self.height) // 2
+        self.x_start, self.y_start = self.at(*ScreenLayout.MAZE_ORIGIN)
+
+    @classmethod
+    def of(cls, screen):
+        """Return the shared layout for a screen surface's size"""
+        size = screen.get_size()
+        layout = cls.layouts.get(size)
+        if layout is None:
+            layout = cls(size)
+            cls.layouts[size] = layout
+        return layout
+
+    @staticmethod
+    def fit_block_size(screen_size):
+        """Return the largest tile size at which the design area fits the screen"""
+        scale = min(screen_size[0] / ScreenLayout.DESIGN_SIZE[0], screen_size[1] / ScreenLayout.DESIGN_SIZE[1])
+        return max(int(ScreenLayout.DESIGN_BLOCK * scale), ScreenLayout.MIN_BLOCK)
+
+    def at(self, x_fraction, y_fraction):
+        """Return the screen position at the given fractions of the design area's width and height"""
+        return self.left + int(self.width * x_fraction), self.top + int(self.height * y_fraction)
+
+    def font_size(self, size):
+        """Return the size of a font which is the given size on the design screen"""
+        return max(int(size * self.scale), 1)
+
+    def tile_position(self, tile, offset=0):
+        """Return the screen position of a tile's top left corner, plus an offset"""
+        return (self.x_start + offset + (tile[1] * self.block_size),
+                self.y_start + offset + (tile[0] * self.block_size))
+
+    def tile_at(self, x, y):
+        """Return the (row, col) of the tile holding a screen position"""
+        return (y - self.y_start) // self.block_size, (x - self.x_start) // self.block_size
+
+    def is_aligned(self, x, y):
+        """Return True if a screen position is exactly at a tile's top left corner"""
+        return (x - self.x_start) % self.block_size == 0 and (y - self.y_start) % self.block_size == 0
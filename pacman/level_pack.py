@@ -0,0 +1,82 @@
+import os
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from maze import Maze
+from maze_format import MazeFile
+
+
+class LevelPack:
+    """The maze maps played at each level, from a single map file, a directory or a zip archive of maps
+    in name order, repeating from the first once every map has been played.
+    The map for an upcoming level can be loaded on a background thread while the game keeps running, which only
+    parses it and works out paths, as the surfaces and images of a maze are shared with the main thread"""
+    EXTENSIONS = ('.txt', MazeFile.EXTENSION)
+
+    def __init__(self, source, background=True):
+        self.source = source
+        self.archive = None
+        self.lock = threading.Lock()    # the archive is read from the main and background threads
+        if os.path.isdir(source):
+            self.maps = sorted(os.path.join(source, name) for name in os.listdir(source)
+                               if name.endswith(LevelPack.EXTENSIONS))
+        elif zipfile.is_zipfile(source):
+            self.archive = zipfile.ZipFile(source)
+            self.maps = sorted(name for name in self.archive.namelist() if name.endswith(LevelPack.EXTENSIONS))
+        else:
+            self.maps = [source]
+        if not self.maps:
+            raise ValueError('no maze maps found in {}'.format(source))
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level-pack') if background else None
+
+    def map_for(self, level):
+        """Return the name of the map played at a level, counting from 1"""
+        return self.maps[(level - 1) % len(self.maps)]
+
+    def load_layout(self, name):
+        """Return the parsed template and path finder of a map in the pack"""
+        if self.archive:
+            with self.lock:
+                data = self.archive.read(name)
+            return Maze.load_map(name, data)
+        return Maze.load_map(name)
+
+    def load_level(self, level):
+        """Return the parsed template and path finder of the map played at a level, with the ghosts' paths home
+        and out of the ghost house worked out ahead of time. Safe to call from the background thread"""
+        template, path_finder = self.load_layout(self.map_for(level))
+        for spawn in template.ghost_spawn:
+            path_finder.distance_field(spawn)
+            house_exit = path_finder.house_exit(spawn)
+            if house_exit is not None:
+                path_finder.distance_field(house_exit)
+        return template, path_finder
+
+    def create_maze(self, screen, level, build=True, layout=None):
+        """Create the maze for a level from its layout if it was loaded already, leaving its items unplaced
+        unless build is set"""
+        name = self.map_for(level)
+        return Maze(screen=screen, maze_map_file=name, layout=layout or self.load_layout(name), build=build)
+
+    def prepare(self, screen, level, layout=None):
+        """Create everything the maze for a level needs except its random items, which are placed when it is
+        built so that a seeded game always uses random numbers in the same order. Must be called from the main
+        thread, as it creates surfaces and packs images into the shared atlas"""
+        maze = self.create_maze(screen, level, build=False, layout=layout)
+        maze.warm_assets()
+        return maze
+
+    def prefetch(self, level):
+        """Return a future for the loaded layout of a level, loaded on the background thread if there is one"""
+        if self.executor:
+            return self.executor.submit(self.load_level, level)
+        future = Future()
+        future.set_result(self.load_level(level))
+        return future
+
+    def close(self):
+        """Stop the background thread and close the archive"""
+        if self.executor:
+            self.executor.shutdown(wait=False)
+        if self.archive:
+            self.archive.close()
@@ -1,6 +1,8 @@
-import pygame
 from score import ScoreBoard
 from image_manager import ImageManager
+from asset_cache import AssetCache
+from text_renderer import TextRenderer
+from layout import ScreenLayout
 
 
 class ImageRow:
@@ -8,13 +10,13 @@ class ImageRow:
     def __init__(self, screen, img, count, label, pos=(0, 0), color=ScoreBoard.SCORE_WHITE):
         self.screen = screen
         if isinstance(img, str):
-            self.image = pygame.image.load('images/' + img)
+            self.image = AssetCache.image(img, convert=False)
         else:
             self.image = img
         self.image_count = None
         self.image_rects = None
         self.color = color
-        self.font = pygame.font.Font('fonts/LuckiestGuy-Regular.ttf', 36)
+        self.text_renderer = TextRenderer.get('fonts/LuckiestGuy-Regular.ttf', ScreenLayout.of(screen).font_size(36))
         self.text = label
         self.text_image = None
         self.text_image_rect = None
@@ -31,7 +33,7 @@ class ImageRow:
 
     def render_text(self):
         """Render the text as an image to be displayed"""
-        self.text_image = self.font.render(self.text, True, self.color)
+        self.text_image = self.text_renderer.render(self.text, self.color)
         self.text_image_rect = self.text_image.get_rect()
 
     def update(self, n_count):
@@ -46,9 +48,8 @@ class ImageRow:
 
     def blit(self):
         """Blit the image row display to the screen"""
-        self.screen.blit(self.text_image, self.text_image_rect)
-        for rect in self.image_rects:
-            self.screen.blit(self.image, rect)
+        self.screen.blits([(self.text_image, self.text_image_rect)] + [(self.image, rect) for rect in self.image_rects],
+                          doreturn=False)
 
 
 class PacManCounter:
@@ -76,6 +77,10 @@ class PacManCounter:
         self.lives = self.max_lives
         self.life_display.update(self.lives)
 
+    def get_rects(self):
+        """Return the screen areas covered by the counter display"""
+        return [self.life_display.text_image_rect] + self.life_display.image_rects
+
     def blit(self):
         """Blit the counter display to the screen"""
         self.life_display.blit()
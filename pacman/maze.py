@@ -1,7 +1,12 @@
 import pygame
 from block import Block
 from fruit import Fruit
-from random import randrange
+from image_manager import ImageManager
+from layout import ScreenLayout
+from random import randrange, choice
+from pathfinding import PathFinder
+from spatial_hash import SpatialHash
+from maze_format import MazeFile
 
 
 class Teleporter:
@@ -11,25 +16,78 @@ class Teleporter:
         self.block_2 = block_2
 
     def check_teleport(self, *args):
-        """Check whether another rectangle has collided with either teleportation point"""
+        """Check whether other rectangles have collided with either teleportation point, moving them to the other,
+        and return True if any were moved"""
+        moved = False
         for other in args:
             if pygame.Rect.colliderect(self.block_1, other):
                 other.x, other.y = (self.block_2.x - self.block_2.width), self.block_2.y
+                moved = True
             elif pygame.Rect.colliderect(self.block_2, other):
                 other.x, other.y = (self.block_1.x + self.block_1.width), self.block_1.y
+                moved = True
+        return moved
+
+
+class MazeTemplate:
+    """The static layout of a maze map, parsed once and shared by every rebuild of the maze"""
+    def __init__(self, map_lines):
+        self.load(*PathFinder.encode(map_lines))
+
+    @classmethod
+    def from_tiles(cls, rows, cols, tiles, spawns=None):
+        """Create a template from a maze's tile codes, as returned by PathFinder.encode, using the
+        (player spawn, ghost spawns, teleports) of a compiled maze file if given rather than searching for them"""
+        template = cls.__new__(cls)
+        template.load(rows, cols, tiles, spawns)
+        return template
+
+    def load(self, rows, cols, tiles, spawns=None):
+        """Find the position of everything in the maze from its tile codes"""
+        self.tiles = bytes(tiles)
+        self.rows = rows
+        self.cols = cols
+        grid_codes = bytearray(256)     # tile code -> Maze.grid value, for walls and shields
+        grid_codes[ord('X')] = Maze.WALL_TILE
+        grid_codes[ord('s')] = Maze.SHIELD_TILE
+        self.grid = self.tiles.translate(grid_codes)
+        find = PathFinder.find_tiles
+        self.walls = tuple(find(self.tiles, cols, 'X'))
+        self.pellets = tuple(find(self.tiles, cols, '*'))   # pellet or fruit, decided on every rebuild
+        self.power_pellets = tuple(find(self.tiles, cols, '@'))
+        self.shields = tuple(find(self.tiles, cols, 's'))
+        if spawns:
+            self.player_spawn, ghost_spawn, teleports = spawns
+        else:
+            player_spawn = find(self.tiles, cols, 'o')
+            self.player_spawn = player_spawn[-1] if player_spawn else None
+            ghost_spawn = find(self.tiles, cols, 'g')
+            teleports = find(self.tiles, cols, 't')
+        self.ghost_spawn = tuple(ghost_spawn)
+        self.teleports = tuple(teleports)
+
+    def map_lines(self):
+        """Return the maze map as lines of text"""
+        return [self.tiles[i:i + self.cols].rstrip(b'\0').decode('latin-1') + '\n'
+                for i in range(0, self.rows * self.cols, self.cols)]
 
 
 class Maze:
     """Represents the maze displayed to the screen"""
 
+    OPEN_TILE = 0   # occupancy grid values
+    WALL_TILE = 1
+    SHIELD_TILE = 2
+
     NEON_BLUE = (25, 25, 166)
     WHITE = (255, 255, 255)
     PELLET_YELLOW = (255, 255, 0)
 
-    def __init__(self, screen, maze_map_file):
+    def __init__(self, screen, maze_map_file, layout=None, build=True):
         self.screen = screen
         self.map_file = maze_map_file
-        self.block_size = 10
+        self.screen_layout = ScreenLayout.of(screen)    # tile size and position on the screen
+        self.block_size = self.screen_layout.block_size
         self.block_image = pygame.Surface((self.block_size, self.block_size))   # create a block surface
         self.block_image.fill(Maze.NEON_BLUE)
         self.shield_image = pygame.Surface((self.block_size, self.block_size // 2))     # create a shield surface
@@ -40,85 +98,162 @@ class Maze:
         self.ppellet_image = pygame.Surface((self.block_size // 2, self.block_size // 2))  # create a pellet surface
         pygame.draw.circle(self.ppellet_image, Maze.WHITE,  # draw power pellet onto pellet surface
                            (self.block_size // 4, self.block_size // 4), self.block_size // 4)
-        with open(self.map_file, 'r') as file:
-            self.map_lines = file.readlines()
+        # walls never change, so paths are shared
+        self.template, self.path_finder = layout or self.load_map(maze_map_file)
+        self.map_lines = self.template.map_lines()
         self.maze_blocks = pygame.sprite.Group()    # maze assets
         self.shield_blocks = pygame.sprite.Group()
         self.pellets = pygame.sprite.Group()
         self.power_pellets = pygame.sprite.Group()
         self.fruits = pygame.sprite.Group()
         self.teleport = None
+        self.layout_version = 0     # incremented whenever the maze is rebuilt or its walls change
+        self.walls_version = 0  # incremented whenever walls or shields change
+        self.dirty_rects = []   # screen areas of items removed since the last draw
+        self.x_start = self.screen_layout.x_start   # screen offset of the maze's top left corner
+        self.y_start = self.screen_layout.y_start
+        self.grid_rows = self.template.rows
+        self.grid_cols = self.template.cols
+        self.grid = bytearray(self.template.grid)  # occupancy grid of walls and shields
+        origin = (self.x_start, self.y_start)
+        self.pellet_index = SpatialHash(self.block_size, origin, static=True)   # items indexed by tile
+        self.fruit_index = SpatialHash(self.block_size, origin, static=True)
+        self.power_index = SpatialHash(self.block_size, origin, static=True)
+        self.pellets_remaining = 0  # pellets and power pellets still in the maze
         self.player_spawn = None    # spawn points
         self.ghost_spawn = []
-        self.build_maze()   # init maze from file data
+        self.init_blocks()
+        if build:
+            self.build_maze()   # init maze from file data
+
+    @staticmethod
+    def load_map(maze_map_file, data=None):
+        """Return the template and path finder of a text maze map, or of a compiled maze file
+        along with any distance fields it holds, read from the file's data if given"""
+        if maze_map_file.endswith(MazeFile.EXTENSION):
+            compiled = MazeFile(maze_map_file) if data is None else MazeFile.from_bytes(data, maze_map_file)
+            template = MazeTemplate.from_tiles(compiled.rows, compiled.cols, compiled.tiles, compiled.spawns())
+            path_finder = PathFinder.from_tiles(compiled.rows, compiled.cols, compiled.tiles)
+            path_finder.fields.update(compiled.fields)
+            return template, path_finder
+        if data is None:
+            with open(maze_map_file, 'r') as file:
+                map_lines = file.readlines()
+        else:
+            map_lines = data.decode('latin-1').splitlines(keepends=True)
+        return MazeTemplate(map_lines), PathFinder(map_lines)
+
+    def warm_assets(self):
+        """Load and scale the fruit images ahead of time, so that no rebuild has to"""
+        for image in Fruit.IMAGES:
+            ImageManager(img=image, resize=(self.block_size // 2, self.block_size // 2))
+
+    def tile_position(self, tile, offset=0):
+        """Return the screen position of a tile's top left corner, plus an offset"""
+        return self.screen_layout.tile_position(tile, offset)
+
+    def init_blocks(self):
+        """Create every sprite the maze will ever need, so rebuilding only has to revive them"""
+        for tile in self.template.walls:
+            self.maze_blocks.add(Block(*self.tile_position(tile), self.block_size, self.block_size,
+                                       self.block_image))
+        self.pellet_pool = [(tile, Block(*self.tile_position(tile, self.block_size // 3),
+                                         self.block_size, self.block_size, self.pellet_image))
+                            for tile in self.template.pellets]
+        self.fruit_pool = {}    # fruit is created on first use for a tile and image, then reused
+        self.power_pool = [Block(*self.tile_position(tile, self.block_size // 3),
+                                 self.block_size, self.block_size, self.ppellet_image)
+                           for tile in self.template.power_pellets]
+        self.shield_pool = [Block(*self.tile_position(tile), self.block_size // 2, self.block_size // 2,
+                                  self.shield_image)
+                            for tile in self.template.shields]
+        tile = self.template.player_spawn
+        if tile:
+            self.player_spawn = [tile, self.tile_position(tile, self.block_size // 2)]
+        if len(self.template.teleports) == 2:
+            self.teleport = Teleporter(*(pygame.Rect(self.tile_position(t), (self.block_size, self.block_size))
+                                         for t in self.template.teleports))
 
     def pellets_left(self):
         """Return True if the maze still has pellets, False if not"""
-        return True if self.pellets or self.power_pellets else False
+        return self.pellets_remaining > 0
 
     def build_maze(self):
-        """Build the maze layout based on the maze map text file"""
-        # reset maze assets if they exist already
-        if self.maze_blocks or self.pellets or self.fruits or self.power_pellets or self.shield_blocks:
-            self.maze_blocks.empty()
-            self.pellets.empty()
-            self.power_pellets.empty()
-            self.fruits.empty()
-            self.shield_blocks.empty()
-        if len(self.ghost_spawn) > 0:
-            self.ghost_spawn.clear()
-        teleport_points = []
-        y_start = self.screen.get_height() // 12
-        y = 0
-        for i in range(len(self.map_lines)):
-            line = self.map_lines[i]
-            x_start = self.screen.get_width() // 5
-            x = 0
-            for j in range(len(line)):
-                co = line[j]
-                if co == 'X':
-                    self.maze_blocks.add(Block(x_start + (x * self.block_size),
-                                               y_start + (y * self.block_size),
-                                               self.block_size, self.block_size,
-                                               self.block_image))
-                elif co == '*':
-                    if randrange(0, 100) > 1:
-                        self.pellets.add(Block(x_start + (self.block_size // 3) + (x * self.block_size),
-                                               y_start + (self.block_size // 3) + (y * self.block_size),
-                                               self.block_size, self.block_size,
-                                               self.pellet_image))
-                    else:
-                        self.fruits.add(Fruit(x_start + (self.block_size // 4) + (x * self.block_size),
-                                              y_start + (self.block_size // 4) + (y * self.block_size),
-                                              self.block_size, self.block_size))
-                elif co == '@':
-                    self.power_pellets.add(Block(x_start + (self.block_size // 3) + (x * self.block_size),
-                                                 y_start + (self.block_size // 3) + (y * self.block_size),
-                                                 self.block_size, self.block_size,
-                                                 self.ppellet_image))
-                elif co == 's':
-                    self.shield_blocks.add(Block(x_start + (x * self.block_size),
-                                                 y_start + (y * self.block_size),
-                                                 self.block_size // 2, self.block_size // 2,
-                                                 self.shield_image))
-                elif co == 'o':
-                    self.player_spawn = [(i, j), (x_start + (x * self.block_size) + (self.block_size // 2),
-                                         y_start + (y * self.block_size) + (self.block_size // 2))]
-                elif co == 'g':
-                    self.ghost_spawn.append(((i, j), (x_start + (x * self.block_size),
-                                            y_start + (y * self.block_size))))
-                elif co == 't':
-                    teleport_points.append(pygame.Rect(x_start + (x * self.block_size),
-                                                       y_start + (y * self.block_size),
-                                                       self.block_size, self.block_size))
-                x += 1
-            y += 1
-        if len(teleport_points) == 2:
-            self.teleport = Teleporter(teleport_points[0], teleport_points[1])
+        """Restore the maze's pellets, fruit and shields to their initial state"""
+        self.pellets.empty()
+        self.power_pellets.empty()
+        self.fruits.empty()
+        if len(self.shield_blocks) != len(self.shield_pool):
+            self.walls_version += 1
+        self.shield_blocks.empty()
+        self.pellet_index.clear()
+        self.fruit_index.clear()
+        self.power_index.clear()
+        self.ghost_spawn.clear()
+        self.grid[:] = self.template.grid
+        self.dirty_rects.clear()
+        self.layout_version += 1
+        for tile, pellet in self.pellet_pool:
+            if randrange(0, 100) > 1:
+                self.pellets.add(pellet)
+                self.pellet_index.add(pellet)
+            else:
+                image = choice(Fruit.IMAGES)    # chosen on every rebuild, so a seed always gives the same maze
+                fruit = self.fruit_pool.get((tile, image))
+                if fruit is None:
+                    fruit = Fruit(*self.tile_position(tile, self.block_size // 4), self.block_size, self.block_size,
+                                  image=image)
+                    self.fruit_pool[(tile, image)] = fruit
+                self.fruits.add(fruit)
+                self.fruit_index.add(fruit)
+        self.power_pellets.add(self.power_pool)
+        for power_pellet in self.power_pool:
+            self.power_index.add(power_pellet)
+        self.pellets_remaining = len(self.pellet_index) + len(self.power_index)
+        self.shield_blocks.add(self.shield_pool)
+        for tile in self.template.ghost_spawn:
+            self.ghost_spawn.append((tile, self.tile_position(tile)))
+            self.path_finder.distance_field(tile)   # cache return routes to each ghost spawn
+
+    def is_blocked(self, rect, dx=0, dy=0, shields=True):
+        """Return True if the rectangle moved by (dx, dy) would collide with a wall, or a shield if requested"""
+        left = rect.x + int(dx) - self.x_start
+        top = rect.y + int(dy) - self.y_start
+        first_col = left // self.block_size
+        last_col = (left + rect.width - 1) // self.block_size
+        first_row = top // self.block_size
+        last_row = (top + rect.height - 1) // self.block_size
+        shield_size = self.block_size // 2
+        for row in range(max(first_row, 0), min(last_row, self.grid_rows - 1) + 1):
+            offset = row * self.grid_cols
+            for col in range(max(first_col, 0), min(last_col, self.grid_cols - 1) + 1):
+                tile = self.grid[offset + col]
+                if tile == Maze.WALL_TILE:
+                    return True
+                if tile == Maze.SHIELD_TILE and shields:
+                    # shields only cover the top left quarter of their tile
+                    if left < (col * self.block_size) + shield_size and \
+                            top < (row * self.block_size) + shield_size:
+                        return True
+        return False
+
+    def remove_item(self, item):
+        """Remove a pellet, power pellet or fruit from the maze and remember the area it covered"""
+        item.kill()
+        if self.pellet_index.remove(item) or self.power_index.remove(item):
+            self.pellets_remaining -= 1
+        else:
+            self.fruit_index.remove(item)
+        self.dirty_rects.append(pygame.Rect(item.rect.topleft, item.image.get_size()))
 
     def remove_shields(self):
         """Remove any shields from the maze"""
         self.shield_blocks.empty()
+        self.layout_version += 1
+        self.walls_version += 1
+        for i, tile in enumerate(self.grid):
+            if tile == Maze.SHIELD_TILE:
+                self.grid[i] = Maze.OPEN_TILE
 
     def blit(self):
         """Blit all maze blocks to the screen"""
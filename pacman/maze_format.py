@@ -0,0 +1,104 @@
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+from pathfinding import PathFinder
+
+
+class MazeFile:
+    """A compiled maze map, memory mapped read-only so that its tiles and distance fields load instantly
+    and are shared between every process using the same file.
+
+    Layout, little endian: a header, one byte per tile holding the map's character (NUL off the map),
+    the player spawn, ghost spawns and teleporters as (row, col) pairs, the target tile of each distance field,
+    then each distance field as one 16 bit signed distance per tile."""
+    EXTENSION = '.pmz'
+    MAGIC = b'PMZ\0'
+    VERSION = 1
+    # magic, version, rows, cols, player spawn row and col (-1 if none), ghost spawns, teleports, distance fields
+    HEADER = struct.Struct('<4sHHHhhHHH')
+    TILE = struct.Struct('<HH')
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.parse(path, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_bytes(cls, data, name='<bytes>'):
+        """Read a compiled maze held in memory, such as a file from an archive"""
+        maze_file = cls.__new__(cls)
+        maze_file.parse(name, data)
+        return maze_file
+
+    def parse(self, path, data):
+        """Read the header and set up views of the tiles and distance fields"""
+        self.data = data
+        view = memoryview(self.data)
+        magic, version, self.rows, self.cols, row, col, n_ghosts, n_teleports, n_fields = \
+            MazeFile.HEADER.unpack_from(view)
+        if magic != MazeFile.MAGIC or version != MazeFile.VERSION:
+            raise ValueError('{} is not a version {} compiled maze'.format(path, MazeFile.VERSION))
+        size = self.rows * self.cols
+        offset = MazeFile.HEADER.size
+        self.tiles = view[offset:offset + size]
+        offset += size
+        self.player_spawn = (row, col) if row >= 0 else None
+        tiles = [tuple(t) for t in MazeFile.TILE.iter_unpack(view[offset:offset + MazeFile.TILE.size *
+                                                                  (n_ghosts + n_teleports + n_fields)])]
+        self.ghost_spawn = tiles[:n_ghosts]
+        self.teleports = tiles[n_ghosts:n_ghosts + n_teleports]
+        offset += MazeFile.TILE.size * len(tiles) + (size % 2)  # fields are aligned to 2 bytes
+        self.fields = {}    # target tile -> distance field, as PathFinder.distance_field
+        for target in tiles[n_ghosts + n_teleports:]:
+            field = view[offset:offset + size * 2].cast('h')
+            if sys.byteorder != 'little':
+                field = array('h', field)
+                field.byteswap()
+            self.fields[target] = field
+            offset += size * 2
+
+    def spawns(self):
+        """Return the player spawn, ghost spawns and teleporters, as accepted by MazeTemplate.from_tiles"""
+        return self.player_spawn, self.ghost_spawn, self.teleports
+
+    @staticmethod
+    def compile(source, dest=None, distances=True):
+        """Compile a text maze map, storing the distance fields to every ghost spawn if requested,
+        and return the path of the compiled file"""
+        dest = dest or source.rsplit('.', 1)[0] + MazeFile.EXTENSION
+        with open(source, 'r') as file:
+            rows, cols, tiles = PathFinder.encode(file.readlines())
+        player_spawn = PathFinder.find_tiles(tiles, cols, 'o')
+        row, col = player_spawn[-1] if player_spawn else (-1, -1)
+        ghost_spawn = PathFinder.find_tiles(tiles, cols, 'g')
+        teleports = PathFinder.find_tiles(tiles, cols, 't')
+        targets = ghost_spawn if distances else []
+        path_finder = PathFinder.from_tiles(rows, cols, tiles)
+        with open(dest, 'wb') as file:
+            file.write(MazeFile.HEADER.pack(MazeFile.MAGIC, MazeFile.VERSION, rows, cols, row, col,
+                                            len(ghost_spawn), len(teleports), len(targets)))
+            file.write(tiles)
+            for tile in ghost_spawn + teleports + targets:
+                file.write(MazeFile.TILE.pack(*tile))
+            file.write(b'\0' * ((rows * cols) % 2))
+            for target in targets:
+                field = array('h', path_finder.distance_field(target))
+                if sys.byteorder != 'little':
+                    field.byteswap()
+                file.write(field.tobytes())
+        return dest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile a text maze map into the memory mapped maze format')
+    parser.add_argument('source', help='text maze map, such as maze_map.txt')
+    parser.add_argument('--output', '-o', metavar='PATH', help='compiled file (default: source with .pmz)')
+    parser.add_argument('--no-distances', action='store_true', help='leave out the ghost spawn distance fields')
+    args = parser.parse_args()
+    print(MazeFile.compile(args.source, args.output, distances=not args.no_distances))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,6 @@
-import pygame
 from pacman import PacMan
+from text_renderer import TextRenderer
+from layout import ScreenLayout
 
 
 
@@ -12,12 +13,13 @@ class Button:
         # Dimensions and properties of the button
         self.text_color = text_color
         self.alt_color = alt_color
-        self.font = pygame.font.Font('fonts/LuckiestGuy-Regular.ttf', size)
+        self.text = TextRenderer.get('fonts/LuckiestGuy-Regular.ttf', ScreenLayout.of(screen).font_size(size))
         self.pos = pos
 
         # Prep button message
         self.msg = msg
         self.msg_image, self.msg_image_rect = None, None
+        self.hover = False
         self.prep_msg(self.text_color)
 
     def check_button(self, mouse_x, mouse_y):
@@ -29,14 +31,14 @@ class Button:
 
     def alter_text_color(self, mouse_x, mouse_y):
         """Change text color if the mouse coordinates collide with the button"""
-        if self.check_button(mouse_x, mouse_y):
-            self.prep_msg(self.alt_color)
-        else:
-            self.prep_msg(self.text_color)
+        hover = self.check_button(mouse_x, mouse_y)
+        if hover != self.hover:     # only swap images when the hover state changes
+            self.hover = hover
+            self.prep_msg(self.alt_color if hover else self.text_color)
 
     def prep_msg(self, color):
         """Turn msg into a rendered image and center it on the button"""
-        self.msg_image = self.font.render(self.msg, True, color)
+        self.msg_image = self.text.render(self.msg, color)
         self.msg_image_rect = self.msg_image.get_rect()
         self.msg_image_rect.centerx, self.msg_image_rect.centery = self.pos
 
@@ -47,12 +49,12 @@ class Button:
 
 class HighScoreScreen:
     """Displays high score data to the screen"""
-    def __init__(self, screen, score_controller, size=26, background=(0, 0, 0)):
+    def __init__(self, screen, score_store, size=26, background=(0, 0, 0)):
         self.screen = screen
-        self.score_controller = score_controller
+        self.score_store = score_store
         self.back_button = Button(screen, 'Back', pos=(int(screen.get_width() * 0.25), int(screen.get_height() * 0.9)),
                                   alt_color=PacMan.PAC_YELLOW)
-        self.font = pygame.font.Font('fonts/LuckiestGuy-Regular.ttf', size)
+        self.text = TextRenderer.get('fonts/LuckiestGuy-Regular.ttf', ScreenLayout.of(screen).font_size(size))
         self.images = []
         self.active = False
         self.background = background
@@ -67,16 +69,19 @@ class HighScoreScreen:
             image[1].centery = y_offset
             y_offset += int(image[1].height * 2)
 
-    def check_done(self):
-        """Check if the back button has been pressed"""
-        self.back_button.alter_text_color(*pygame.mouse.get_pos())
-        self.active = not self.back_button.check_button(*pygame.mouse.get_pos())
+    def check_done(self, event):
+        """Check if the mouse has moved onto the back button"""
+        self.back_button.alter_text_color(*event.pos)
+        self.active = not self.back_button.check_button(*event.pos)
 
     def prep_images(self):
-        """Render all scores as displayable images"""
+        """Render the cached top scores as displayable images"""
         self.images.clear()
-        for num, score in enumerate(self.score_controller.high_scores):
-            image = self.font.render('#' + str(num + 1) + ' :  ' + str(score), True, (255, 255, 255))
+        for num, record in enumerate(self.score_store.top_scores()):
+            text = '#{} :  {}  {}'.format(num + 1, record.score, record.name)
+            if record.level is not None:    # unknown for scores imported from the old high score file
+                text += '  level {}'.format(record.level)
+            image = self.text.render(text, (255, 255, 255))
             rect = image.get_rect()
             self.images.append([image, rect])
 
@@ -101,15 +106,15 @@ class Menu:
         self.hs_screen = False
         self.ready_to_play = False
 
-    def check_buttons(self):
-        """Set flags based on whether the play button or the high score screen button has been pressed"""
-        self.ready_to_play = self.play_button.check_button(*pygame.mouse.get_pos())
-        self.hs_screen = self.high_scores_button.check_button(*pygame.mouse.get_pos())
+    def check_buttons(self, event):
+        """Set flags based on whether the play button or the high score screen button has been clicked"""
+        self.ready_to_play = self.play_button.check_button(*event.pos)
+        self.hs_screen = self.high_scores_button.check_button(*event.pos)
 
-    def update(self):
-        """Update any changing features of the menu"""
-        self.play_button.alter_text_color(*pygame.mouse.get_pos())
-        self.high_scores_button.alter_text_color(*pygame.mouse.get_pos())
+    def hover(self, event):
+        """Highlight the buttons under the mouse as it moves"""
+        self.play_button.alter_text_color(*event.pos)
+        self.high_scores_button.alter_text_color(*event.pos)
 
     def blit(self):
         """Blit all display elements to the screen"""
@@ -6,31 +6,35 @@ from sound_manager import SoundManager
 class PacMan(pygame.sprite.Sprite):
     """Represents the player character 'PacMan' and its related logic/control"""
     PAC_YELLOW = (255, 255, 0)
-    PAC_AUDIO_CHANNEL = 0
+    PAC_AUDIO_PRIORITY = 2
+    SOUND_FILES = ['pacman-pellet-eat.wav', 'Eaten1.wav', 'Eaten4.wav']
+    DESIGN_SPEED = 1    # pixels moved per step at the design tile size, a tenth of a tile like the ghosts
 
-    def __init__(self, screen, maze):
+    def __init__(self, screen, maze, timers=None):
         super().__init__()
         self.screen = screen
+        self.timers = timers    # timer wheel pacing the animations
         self.radius = maze.block_size
         self.maze = maze
-        self.sound_manager = SoundManager(sound_files=['pacman-pellet-eat.wav', 'Eaten1.wav',
-                                                       'Eaten4.wav'],
+        self.sound_manager = SoundManager(sound_files=PacMan.SOUND_FILES,
                                           keys=['eat', 'fruit', 'dead'],
-                                          channel=PacMan.PAC_AUDIO_CHANNEL)
+                                          priority=PacMan.PAC_AUDIO_PRIORITY)
         self.horizontal_images = ImageManager('pacman-horiz.png', sheet=True, pos_offsets=[(0, 0, 32, 32),
                                                                                            (32, 0, 32, 32),
                                                                                            (0, 32, 32, 32),
                                                                                            (32, 32, 32, 32),
                                                                                            (0, 64, 32, 32)],
                                               resize=(self.maze.block_size, self.maze.block_size),
-                                              reversible=True)
+                                              reversible=True, timers=self.timers,
+                                              directions={'r': (False, False), 'l': (True, False)})
         self.vertical_images = ImageManager('pacman-vert.png', sheet=True, pos_offsets=[(0, 0, 32, 32),
                                                                                         (32, 0, 32, 32),
                                                                                         (0, 32, 32, 32),
                                                                                         (32, 32, 32, 32),
                                                                                         (0, 64, 32, 32)],
                                             resize=(self.maze.block_size, self.maze.block_size),
-                                            reversible=True)
+                                            reversible=True, timers=self.timers,
+                                            directions={'u': (False, False), 'd': (False, True)})
         self.death_images = ImageManager('pacman-death.png', sheet=True, pos_offsets=[(0, 0, 32, 32),
                                                                                       (32, 0, 32, 32),
                                                                                       (0, 32, 32, 32),
@@ -38,13 +42,14 @@ class PacMan(pygame.sprite.Sprite):
                                                                                       (0, 64, 32, 32),
                                                                                       (32, 64, 32, 32)],
                                          resize=(self.maze.block_size, self.maze.block_size),
-                                         animation_delay=150, repeat=False)
-        self.flip_status = {'use_horiz': True, 'h_flip': False, 'v_flip': False}
+                                         animation_delay=150, repeat=False, timers=self.timers)
+        self.use_horiz = True   # show the horizontal images, or the vertical ones
         self.spawn_info = self.maze.player_spawn[1]
         self.tile = self.maze.player_spawn[0]
         self.direction = None
         self.moving = False
-        self.speed = maze.block_size // 7
+        self.speed = maze.screen_layout.scale * PacMan.DESIGN_SPEED  # the same tiles per step on any screen
+        self.progress = 0   # distance moved but not yet shown, as PacMan is drawn on whole pixels
         self.image, self.rect = self.horizontal_images.get_image()
         self.rect.centerx, self.rect.centery = self.spawn_info   # screen coordinates for spawn
         self.dead = False
@@ -73,6 +78,15 @@ class PacMan(pygame.sprite.Sprite):
     def reset_position(self):
         """Reset position back to pre-define spawn location"""
         self.rect.centerx, self.rect.centery = self.spawn_info  # screen coordinates for spawn
+        self.tile = self.maze.player_spawn[0]
+        self.progress = 0
+
+    def set_maze(self, maze):
+        """Move PacMan into a different maze, at its spawn point"""
+        self.maze = maze
+        self.spawn_info = maze.player_spawn[1]
+        self.tile = maze.player_spawn[0]
+        self.reset_position()
 
     def reset_direction(self, event):
         """Reset the movement direction if key-up on movement keys"""
@@ -88,91 +102,95 @@ class PacMan(pygame.sprite.Sprite):
         """Set move direction up"""
         if self.direction != 'u':
             self.direction = 'u'
-            if self.flip_status['v_flip']:
-                self.vertical_images.flip(False, True)
-                self.flip_status['v_flip'] = False
-            self.flip_status['use_horiz'] = False
+            self.vertical_images.set_direction('u')
+            self.use_horiz = False
         self.moving = True
 
     def set_move_left(self):
         """Set move direction left"""
         if self.direction != 'l':
             self.direction = 'l'
-            if not self.flip_status['h_flip']:
-                self.horizontal_images.flip()
-                self.flip_status['h_flip'] = True
-            self.flip_status['use_horiz'] = True
+            self.horizontal_images.set_direction('l')
+            self.use_horiz = True
         self.moving = True
 
     def set_move_down(self):
         """Set move direction down"""
         if self.direction != 'd':
             self.direction = 'd'
-            if not self.flip_status['v_flip']:
-                self.vertical_images.flip(x_bool=False, y_bool=True)
-                self.flip_status['v_flip'] = True
-            self.flip_status['use_horiz'] = False
+            self.vertical_images.set_direction('d')
+            self.use_horiz = False
         self.moving = True
 
     def set_move_right(self):
         """Set move direction to right"""
         if self.direction != 'r':
             self.direction = 'r'
-            if self.flip_status['h_flip']:
-                self.horizontal_images.flip()
-                self.flip_status['h_flip'] = False
-            self.flip_status['use_horiz'] = True
+            self.horizontal_images.set_direction('r')
+            self.use_horiz = True
         self.moving = True
 
     def get_nearest_col(self):
         """Get the current column location on the maze map"""
-        return (self.rect.x - (self.screen.get_width() // 5)) // self.maze.block_size
+        return self.maze.screen_layout.tile_at(self.rect.x, self.rect.y)[1]
 
     def get_nearest_row(self):
         """Get the current row location on the maze map"""
-        return (self.rect.y - (self.screen.get_height() // 12)) // self.maze.block_size
+        return self.maze.screen_layout.tile_at(self.rect.x, self.rect.y)[0]
+
+    def next_step(self, distance):
+        """Return the whole pixels of a distance to move in the current direction, stopping at the next tile
+        boundary so that PacMan lines up with every tile he crosses, where he can turn"""
+        layout = self.maze.screen_layout
+        if self.direction in ('l', 'r'):
+            offset = (self.rect.x - layout.x_start) % layout.block_size
+        else:
+            offset = (self.rect.y - layout.y_start) % layout.block_size
+        if self.direction in ('r', 'd'):
+            to_boundary = layout.block_size - offset
+        else:
+            to_boundary = offset or layout.block_size
+        return min(int(distance), to_boundary)
 
-    def is_blocked(self):
+    def is_blocked(self, step=None):
         """Check if PacMan is blocked by any maze barriers, return True if blocked, False if clear"""
         result = False
         if self.direction is not None and self.moving:
-            original_pos = self.rect
+            if step is None:
+                step = max(self.next_step(self.progress + self.speed), 1)
             if self.direction == 'u':
-                test = self.rect.move((0, -self.speed))
+                result = self.maze.is_blocked(self.rect, 0, -step)
             elif self.direction == 'l':
-                test = self.rect.move((-self.speed, 0))
+                result = self.maze.is_blocked(self.rect, -step, 0)
             elif self.direction == 'd':
-                test = self.rect.move((0, self.speed))
+                result = self.maze.is_blocked(self.rect, 0, step)
             else:
-                test = self.rect.move((self.speed, 0))
-            self.rect = test    # temporarily move self
-
-            # if any collision, result = True
-            if pygame.sprite.spritecollideany(self, self.maze.maze_blocks):
-                result = True
-            elif pygame.sprite.spritecollideany(self, self.maze.shield_blocks):
-                result = True
-            self.rect = original_pos    # reset position
+                result = self.maze.is_blocked(self.rect, step, 0)
         return result
 
     def update(self):
         """Update PacMan's position in the maze if moving, and if not blocked"""
         if not self.dead:
             if self.direction and self.moving:
-                if self.flip_status['use_horiz']:
+                if self.use_horiz:
                     self.image = self.horizontal_images.next_image()
                 else:
                     self.image = self.vertical_images.next_image()
-                if not self.is_blocked():
+                self.progress += self.speed
+                step = self.next_step(self.progress)
+                if step and self.is_blocked(step):
+                    self.progress = 0   # stopped against a wall
+                elif step:
+                    self.progress -= step   # any distance cut short at a tile boundary is made up next step
                     if self.direction == 'u':
-                        self.rect.centery -= self.speed
+                        self.rect.centery -= step
                     elif self.direction == 'l':
-                        self.rect.centerx -= self.speed
+                        self.rect.centerx -= step
                     elif self.direction == 'd':
-                        self.rect.centery += self.speed
+                        self.rect.centery += step
                     elif self.direction == 'r':
-                        self.rect.centerx += self.speed
-                self.tile = (self.get_nearest_row(), self.get_nearest_col())
+                        self.rect.centerx += step
+                self.tile = self.maze.screen_layout.tile_at(self.rect.x, self.rect.y)
         else:
             self.image = self.death_images.next_image()
 
@@ -185,20 +203,20 @@ class PacMan(pygame.sprite.Sprite):
         score = 0
         fruit_count = 0
         power = None
-        collision = pygame.sprite.spritecollideany(self, self.maze.pellets)
+        collision = self.maze.pellet_index.collide_any(self.rect)
         if collision:
-            collision.kill()
+            self.maze.remove_item(collision)
             score += 10
             self.sound_manager.play('eat')
-        collision = pygame.sprite.spritecollideany(self, self.maze.fruits)
+        collision = self.maze.fruit_index.collide_any(self.rect)
         if collision:
-            collision.kill()
+            self.maze.remove_item(collision)
             score += 20
             fruit_count += 1
             self.sound_manager.play('fruit')
-        collision = pygame.sprite.spritecollideany(self, self.maze.power_pellets)
+        collision = self.maze.power_index.collide_any(self.rect)
         if collision:
-            collision.kill()
+            self.maze.remove_item(collision)
             score += 20
             power = True
             self.sound_manager.play('eat')
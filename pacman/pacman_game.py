@@ -1,12 +1,15 @@
+import argparse
+import random
 import pygame
+from asset_cache import AssetCache
+from audio_bank import AudioBank
 from event_loop import EventLoop
-from ghost import Ghost
-from maze import Maze
-from pacman import PacMan
-from lives_status import PacManCounter
-from score import ScoreController, LevelTransition
-from sound_manager import SoundManager
+from game_state import GameState
 from menu import Menu, HighScoreScreen
+from profiler import FrameProfiler, NullProfiler
+from renderer import DirtyRectRenderer
+from replay import ReplayLog
+from score_store import ScoreStore
 
 
 
@@ -15,175 +18,140 @@ class PacManPortalGame:
     for the running and updating of the PacMan portal game"""
 
     BLACK_BG = (0, 0, 0)
-    START_EVENT = pygame.USEREVENT + 1
-    REBUILD_EVENT = pygame.USEREVENT + 2
-    LEVEL_TRANSITION_EVENT = pygame.USEREVENT + 3
+    MAX_STEPS_PER_FRAME = 5     # limit on catch-up steps after a slow frame
+    SCALED_IMAGE_DIR = 'image_cache'    # sprite sheets scaled for the screen, kept between runs
 
-    def __init__(self):
+    def __init__(self, profile=None, record=None, maze_map_file='maze_map.txt', player_name='PLAYER',
+                 ghost_count=None, fullscreen=False):
+        AudioBank.pre_init()
         pygame.init()
         pygame.mixer.music.load('sounds/IDKMAN.wav')
-        self.screen = pygame.display.set_mode(
-            (800, 600)
-        )
+        AudioBank.preload(GameState.SOUND_FILES)    # decoded once, before anything plays
+        AssetCache.disk_dir = PacManPortalGame.SCALED_IMAGE_DIR
+        if fullscreen:  # at the display's own resolution, the game scaled to fit
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            self.screen = pygame.display.set_mode(
+                GameState.SCREEN_SIZE
+            )
         pygame.display.set_caption('PacMan Portal')
         self.clock = pygame.time.Clock()
-        self.score_keeper = ScoreController(screen=self.screen,
-                                            sb_pos=((self.screen.get_width() // 5),
-                                                    (self.screen.get_height() * 0.965)),
-                                            items_image='cherry.png',
-                                            itc_pos=(int(self.screen.get_width() * 0.6),
-                                                     self.screen.get_height() * 0.965))
-        self.maze = Maze(screen=self.screen, maze_map_file='maze_map.txt')
-        self.life_counter = PacManCounter(screen=self.screen, ct_pos=((self.screen.get_width() // 3),
-                                                                      (self.screen.get_height() * 0.965)),
-                                          images_size=(self.maze.block_size, self.maze.block_size))
-        self.level_transition = LevelTransition(screen=self.screen, score_controller=self.score_keeper)
-        self.game_over = True
-        self.pause = False
-        self.player = PacMan(screen=self.screen, maze=self.maze)
-        self.ghosts = pygame.sprite.Group()
-        self.ghost_sound_manager = SoundManager(sound_files=['RunForestRun.wav', 'Eaten3.wav', 'babySharkPacman.wav'],
-                                                keys=['blue', 'eaten', 'std'],
-                                                channel=Ghost.GHOST_AUDIO_CHANNEL)
-        self.ghost_active_interval = 2500
-        self.ghosts_to_activate = None
-        self.first_ghost = None
-        self.other_ghosts = []
-        self.spawn_ghosts()
-        self.actions = {PacManPortalGame.START_EVENT: self.init_ghosts,
-                        PacManPortalGame.REBUILD_EVENT: self.rebuild_maze,
-                        PacManPortalGame.LEVEL_TRANSITION_EVENT: self.next_level}
-
-    def init_ghosts(self):
-        """kick start the ghost AI over a period of time"""
-        if not self.first_ghost.state['enabled']:
-            self.first_ghost.enable()
-            self.ghosts_to_activate = self.other_ghosts.copy()
-            pygame.time.set_timer(PacManPortalGame.START_EVENT, 0)  # disable timer repeat
-            pygame.time.set_timer(PacManPortalGame.START_EVENT, self.ghost_active_interval)
-        else:
-            try:
-                g = self.ghosts_to_activate.pop()
-                g.enable()
-            except IndexError:
-                pygame.time.set_timer(PacManPortalGame.START_EVENT, 0)  # disable timer repeat
-
-    def spawn_ghosts(self):
-        """Create all ghosts at their starting positions"""
-        files = ['ghost-pink.png', 'ghost-lblue.png', 'ghost-orange.png', 'ghost-red.png']
-        idx = 0
-        while len(self.maze.ghost_spawn) > 0:
-            spawn_info = self.maze.ghost_spawn.pop()
-            g = Ghost(screen=self.screen, maze=self.maze, target=self.player,
-                      spawn_info=spawn_info, ghost_file=files[idx], sound_manager=self.ghost_sound_manager)
-            if files[idx] == 'ghost-red.png':
-                self.first_ghost = g    # red ghost should be first
-            else:
-                self.other_ghosts.append(g)
-            self.ghosts.add(g)
-            idx = (idx + 1) % len(files)
-
-    def next_level(self):
-        """Increment the game level and then continue the game"""
-        pygame.time.set_timer(PacManPortalGame.LEVEL_TRANSITION_EVENT, 0)  # reset timer
-        self.score_keeper.increment_level()
-        self.rebuild_maze()
-
-    def rebuild_maze(self):
-        """Resets the maze to its initial state if the game is still active"""
-        if self.life_counter.lives > 0:
-            for g in self.ghosts:
-                if g.state['enabled']:
-                    g.disable()
-            self.maze.build_maze()
-            self.player.reset_position()
-            for g in self.ghosts:
-                g.reset_position()
-            if self.player.dead:
-                self.player.revive()
-            if self.pause:
-                self.pause = False
-            self.level_transition.set_show_transition()
-        else:
-            self.game_over = True
-        pygame.time.set_timer(PacManPortalGame.REBUILD_EVENT, 0)    # disable timer repeat
-
-    def check_player(self):
-        """Check the player to see if they have been hit by an enemy, or if they have consumed pellets/fruit"""
-        n_score, n_fruits, power = self.player.eat()
-        self.score_keeper.add_score(score=n_score, items=n_fruits if n_fruits > 0 else None)
-        if power:
-            for g in self.ghosts:
-                g.begin_blue_state()
-        ghost_collide = pygame.sprite.spritecollideany(self.player, self.ghosts)
-        if ghost_collide and ghost_collide.state['blue']:
-            ghost_collide.set_eaten()
-            self.score_keeper.add_score(200)
-        elif ghost_collide and not (self.player.dead or ghost_collide.state['return']):
-            self.life_counter.decrement()
-            self.player.set_death()
-            for g in self.ghosts:
-                if g.state['enabled']:   # disable any ghosts
-                    g.disable()
-            pygame.time.set_timer(PacManPortalGame.START_EVENT, 0)  # cancel start event
-            pygame.time.set_timer(PacManPortalGame.REBUILD_EVENT, 4000)
-        elif not self.maze.pellets_left() and not self.pause:
-            pygame.mixer.stop()
-            self.pause = True
-            pygame.time.set_timer(PacManPortalGame.LEVEL_TRANSITION_EVENT, 1000)
+        self.profile = profile  # file the frame timings are written to on exit, if profiling
+        self.profiler = FrameProfiler(self.screen) if profile else NullProfiler()
+        self.record = record    # file each game's replay log is written to, if recording
+        self.replay_log = None
+        self.maze_map_file = maze_map_file  # a maze map, or a directory or zip archive with a map per level
+        self.player_name = player_name  # name saved with each finished game's score
+        self.ghost_count = ghost_count  # one ghost per spawn point in the maze if None
+        self.score_store = ScoreStore()
+        self.state = GameState(screen=self.screen, maze_map_file=maze_map_file, profiler=self.profiler,
+                               score_store=self.score_store, ghost_count=ghost_count)
+        self.inputs = []    # key events waiting for the next simulation step
+        self.renderer = DirtyRectRenderer(self.screen, PacManPortalGame.BLACK_BG, profiler=self.profiler)
+
+    def queue_input(self, event):
+        """Hold a key event until the next simulation step"""
+        self.inputs.append(event)
+
+    def new_state(self, seed, maze_map_file='maze_map.txt', background_loading=True, ghost_count=None):
+        """Replace the game state with a new one built from a random seed, so that it can be reproduced"""
+        self.state.close()
+        random.seed(seed)
+        self.state = GameState(screen=self.screen, maze_map_file=maze_map_file, profiler=self.profiler,
+                               background_loading=background_loading, score_store=self.score_store,
+                               ghost_count=ghost_count)
+
+    def close(self):
+        """Release the game state's level pack and write any pending scores"""
+        self.state.close()
+        self.score_store.close()
+
+    def step(self):
+        """Advance the simulation one step with the queued key events, recording them if requested"""
+        if self.replay_log:
+            self.replay_log.record_inputs(self.inputs)
+        self.state.step(self.inputs)
+        self.inputs = []
 
     def update_screen(self):
         """Update the game screen"""
-        if not self.level_transition.transition_show:
-            self.screen.fill(PacManPortalGame.BLACK_BG)
-            self.check_player()
-            self.maze.blit()
-            if not self.pause:
-                self.ghosts.update()
-                self.player.update()
-                # self.maze.teleport.check_teleport(self.player.rect)     # teleport player/projectiles
-            for g in self.ghosts:
-                if self.score_keeper.level > 3:
-                    if not g.state['speed_boost']:
-                        g.increase_speed()
-                    self.maze.teleport.check_teleport(g.rect)   # teleport ghosts
-                g.blit()
-            self.player.blit()
-            self.score_keeper.blit()
-            self.life_counter.blit()
-        elif self.player.dead:
-            self.player.update()
-            self.player.blit()
+        self.step()
+        self.render()
+        self.profiler.end_frame()
+
+    def render(self):
+        """Draw the current game state to the screen"""
+        state = self.state
+        if self.renderer.draw_state(state, overlay=self.profiler if self.profiler.enabled else None):
+            return
+        elif state.player.dead:
+            state.player.blit()
         else:
-            self.level_transition.draw()
-            # if transition just finished, init ghosts
-            if not self.level_transition.transition_show:
-                self.init_ghosts()
+            state.level_transition.draw()
+        self.renderer.invalidate()  # the screen no longer shows the maze
         pygame.display.flip()
 
     def run(self):
-        """Run the game application, starting from the menu"""
+        """Run the game application, starting from the menu, writing out the frame timings
+        when the application exits if profiling"""
+        try:
+            self.run_menu()
+        finally:
+            if self.profile:
+                self.profiler.dump(self.profile)
+
+    def replay(self, path):
+        """Replay a recorded game as fast as it can be simulated and drawn, without the frame rate limit"""
+        log = ReplayLog.load(path)
+        # running uncapped could outpace the background loading, and hold level transitions for longer
+        self.new_state(log.seed, log.maze_map_file, background_loading=False, ghost_count=log.ghost_count)
+        self.state.start_game()
+        self.renderer.invalidate()
+        e_loop = EventLoop(loop_running=True)   # only allow quitting, the keys come from the log
+        start = pygame.time.get_ticks()
+
+        def frame():
+            e_loop.check_events()
+            self.render()
+            self.profiler.end_frame()
+        try:
+            timers_match = log.play(self.state, on_step=frame)
+        finally:
+            if self.profile:
+                self.profiler.dump(self.profile)
+        pygame.mixer.stop()
+        elapsed = pygame.time.get_ticks() - start
+        print('replayed {} steps in {} ms, score {} (recorded {}), timers {}'.format(
+            log.steps, elapsed, self.state.score_keeper.score, log.final_score(),
+            'match' if timers_match else 'DIVERGED'))
+
+    def run_menu(self):
+        """Run the menu loop, starting a game whenever the player selects play"""
         menu = Menu(self.screen)
-        hs_screen = HighScoreScreen(self.screen, self.score_keeper)
-        e_loop = EventLoop(loop_running=True, actions={pygame.MOUSEBUTTONDOWN: menu.check_buttons})
+        hs_screen = HighScoreScreen(self.screen, self.score_store)
+
+        def hover(event):
+            if menu.hs_screen:
+                hs_screen.check_done(event)
+            else:
+                menu.hover(event)
+        e_loop = EventLoop(loop_running=True, actions={pygame.MOUSEBUTTONDOWN: menu.check_buttons,
+                                                       pygame.MOUSEMOTION: hover})
 
         while e_loop.loop_running:
             self.clock.tick(60)  # 60 fps limit
             e_loop.check_events()
             self.screen.fill(PacManPortalGame.BLACK_BG)
             if not menu.hs_screen:
-                menu.update()
                 menu.blit()
             else:
                 hs_screen.blit()    # display highs score screen
-                hs_screen.check_done()
             if menu.ready_to_play:
                 pygame.mixer.music.stop()   # stop menu music
                 self.play_game()    # player selected play, so run game
-                for g in self.ghosts:
+                for g in self.state.ghosts:
                     g.reset_speed()
                 menu.ready_to_play = False
-                self.score_keeper.save_high_scores()    # save high scores only on complete play
                 hs_screen.prep_images()     # update high scores page
                 hs_screen.position()
             elif not pygame.mixer.music.get_busy():
@@ -191,28 +159,65 @@ class PacManPortalGame:
             pygame.display.flip()
 
     def play_game(self):
-        """Run the game's event loop, using an EventLoop object"""
-        e_loop = EventLoop(loop_running=True, actions={**self.player.event_map, **self.actions})
-        # game init signal
-        # pygame.time.set_timer(PacManPortalGame.START_EVENT, self.level_transition.transition_time)
-        self.level_transition.set_show_transition()
-        self.game_over = False
-        if self.player.dead:
-            self.player.revive()
-            self.score_keeper.reset_level()
-            self.life_counter.reset_counter()
-            self.rebuild_maze()
-
+        """Run the game's event loop, using an EventLoop object, stepping the simulation at a fixed rate"""
+        e_loop = EventLoop(loop_running=True, actions={pygame.KEYDOWN: self.queue_input,
+                                                       pygame.KEYUP: self.queue_input})
+        if self.record:     # start from a new seeded state, as the replay will
+            self.replay_log = ReplayLog(ReplayLog.new_seed(), self.maze_map_file, self.ghost_count)
+            self.new_state(self.replay_log.seed, self.replay_log.maze_map_file, ghost_count=self.ghost_count)
+            self.replay_log.attach(self.state)
+        self.state.start_game()
+        self.inputs = []
+        self.renderer.invalidate()
+        try:
+            self.run_game(e_loop)
+        finally:
+            if self.replay_log:
+                self.replay_log.finish(self.state.score_keeper.score)
+                self.replay_log.save(self.record)
+                self.replay_log = None
+
+    def run_game(self, e_loop):
+        """Step the simulation at a fixed rate until the game is over"""
+        lag = 0
         while e_loop.loop_running:
-            self.clock.tick(60)  # 60 fps limit
+            lag += self.clock.tick(60)  # 60 fps limit
             e_loop.check_events()
-            self.update_screen()
-            if self.game_over:
+            steps = 0
+            while lag >= GameState.STEP_MS and steps < PacManPortalGame.MAX_STEPS_PER_FRAME:
+                self.step()
+                lag -= GameState.STEP_MS
+                steps += 1
+            if steps == PacManPortalGame.MAX_STEPS_PER_FRAME:
+                lag = 0     # too far behind to catch up, drop the remaining time
+            self.render()
+            self.profiler.end_frame()
+            if self.state.game_over:
                 pygame.mixer.stop()
-                self.score_keeper.reset_level()
+                self.state.score_keeper.save_high_scores(self.player_name)  # save only on complete play
+                self.state.score_keeper.reset_level()
                 e_loop.loop_running = False
 
 
 if __name__ == '__main__':
-    game = PacManPortalGame()
-    game.run()
+    parser = argparse.ArgumentParser(description='PacMan Portal')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='show frame timings on screen and write them to PATH (.csv or .json) on exit')
+    parser.add_argument('--record', metavar='PATH', help='write a replay log of each game played to PATH')
+    parser.add_argument('--replay', metavar='PATH', help='replay a recorded game at full speed, then exit')
+    parser.add_argument('--levels', metavar='PATH', default='maze_map.txt',
+                        help='maze map, or directory or zip archive of maps played in name order '
+                             '(default: %(default)s)')
+    parser.add_argument('--name', default='PLAYER', help='name saved with your high scores (default: %(default)s)')
+    parser.add_argument('--ghosts', type=int, metavar='N', help='number of ghosts (default: one per spawn point)')
+    parser.add_argument('--fullscreen', action='store_true', help='fill the screen, scaling the game to fit')
+    args = parser.parse_args()
+    game = PacManPortalGame(profile=args.profile, record=args.record, maze_map_file=args.levels,
+                            player_name=args.name, ghost_count=args.ghosts, fullscreen=args.fullscreen)
+    try:
+        if args.replay:
+            game.replay(args.replay)
+        else:
+            game.run()
+    finally:
+        game.close()
@@ -0,0 +1,212 @@
+from collections import deque
+from heapq import heappush, heappop
+
+
+class PathFinder:
+    """Provides shortest path queries over the tile grid of a maze map"""
+    WALL = 'X'
+    TELEPORT = 't'
+    SHIELD = 's'    # the doors of the ghost house
+    UNREACHABLE = -1
+    PASSABLE = bytes(0 if code in b'X\0' else 1 for code in range(256))  # tile code -> 1 if open
+    DIRECTIONS = (('u', -1, 0), ('l', 0, -1), ('d', 1, 0), ('r', 0, 1))   # direction, row and column step
+    STEPS = {d: (dr, dc) for d, dr, dc in DIRECTIONS}
+
+    def __init__(self, maze_map):
+        self.load(*PathFinder.encode(maze_map))
+
+    @classmethod
+    def from_tiles(cls, rows, cols, tiles):
+        """Create a path finder from a maze's tile codes, as returned by encode"""
+        finder = cls.__new__(cls)
+        finder.load(rows, cols, tiles)
+        return finder
+
+    @staticmethod
+    def encode(maze_map):
+        """Return the number of rows and columns of a text maze map, and its characters as one byte per tile
+        row by row, with short rows padded by NUL bytes which stand for tiles off the map"""
+        lines = [line.rstrip('\n') for line in maze_map]
+        cols = max((len(line) for line in lines), default=0)
+        return len(lines), cols, b''.join(line.encode('latin-1').ljust(cols, b'\0') for line in lines)
+
+    @staticmethod
+    def find_tiles(tiles, cols, char):
+        """Return every (row, col) holding the given character, in row order"""
+        code = char.encode('latin-1')
+        found = []
+        i = tiles.find(code)
+        while i != -1:
+            found.append(divmod(i, cols))
+            i = tiles.find(code, i + 1)
+        return found
+
+    def load(self, rows, cols, tiles):
+        """Set up the grid from tile codes"""
+        tiles = bytes(tiles)
+        self.rows = rows
+        self.cols = cols
+        self.passable = bytearray(tiles.translate(PathFinder.PASSABLE))  # 1 for open tiles, 0 for walls or off map
+        teleports = PathFinder.find_tiles(tiles, cols, PathFinder.TELEPORT)
+        self.teleports = teleports if len(teleports) == 2 else []
+        self.fields = {}    # cache of distance fields, keyed by target tile
+        self.exits = []     # directions leading to an open tile from each tile, in DIRECTIONS order
+        self.shields = set(PathFinder.find_tiles(tiles, cols, PathFinder.SHIELD))
+        self.roaming_exits = []     # exits which do not lead onto a shield, so back into the ghost house
+        for row in range(rows):
+            for col in range(cols):
+                exits = tuple(d for d, dr, dc in PathFinder.DIRECTIONS if self.is_open(row + dr, col + dc))
+                exits = exits if self.is_open(row, col) else ()
+                self.exits.append(exits)
+                self.roaming_exits.append(tuple(d for d in exits
+                                                if PathFinder.step((row, col), d) not in self.shields))
+        self.house_exits = {}   # cache of the tile outside the ghost house, keyed by spawn tile
+
+    def is_open(self, row, col):
+        """Return True if the tile at the given row and column can be moved through"""
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.passable[row * self.cols + col] == 1
+        return False
+
+    def tile_exits(self, tile):
+        """Return the directions leading from a tile to an open tile, or none if the tile is off the map"""
+        row, col = tile
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.exits[row * self.cols + col]
+        return ()
+
+    @staticmethod
+    def step(tile, direction):
+        """Return the tile one step from a tile in the given direction"""
+        dr, dc = PathFinder.STEPS[direction]
+        return tile[0] + dr, tile[1] + dc
+
+    def house_exit(self, spawn):
+        """Return the nearest tile outside the ghost house around a spawn tile, where the house is everything
+        reachable from the spawn without crossing a shield, or None if the spawn is not shut in by shields"""
+        if spawn not in self.house_exits:
+            house = {spawn}
+            frontier = deque([spawn])
+            while frontier:
+                for n in self.neighbors(frontier.popleft()):
+                    if n not in house and n not in self.shields:
+                        house.add(n)
+                        frontier.append(n)
+            found = None
+            seen = {spawn}
+            frontier = deque([spawn])
+            while frontier and found is None:
+                for n in self.neighbors(frontier.popleft()):
+                    if n not in seen:
+                        if n not in house and n not in self.shields:
+                            found = n
+                            break
+                        seen.add(n)
+                        frontier.append(n)
+            self.house_exits[spawn] = found
+        return self.house_exits[spawn]
+
+    def neighbors(self, tile):
+        """Return all open tiles reachable in one step from the given tile, including teleportation"""
+        row, col = tile
+        result = [n for n in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)) if self.is_open(*n)]
+        if tile in self.teleports:
+            result.append(self.teleports[1] if tile == self.teleports[0] else self.teleports[0])
+        return result
+
+    def heuristic(self, tile, target):
+        """Manhattan distance between two tiles, allowing for a shortcut through the teleporter"""
+        best = abs(tile[0] - target[0]) + abs(tile[1] - target[1])
+        if self.teleports:
+            t_1, t_2 = self.teleports
+            for a, b in ((t_1, t_2), (t_2, t_1)):
+                via = abs(tile[0] - a[0]) + abs(tile[1] - a[1]) + 1 + abs(b[0] - target[0]) + abs(b[1] - target[1])
+                best = min(best, via)
+        return best
+
+    def find_path(self, start, target):
+        """Determine the shortest path from the start to the target tile using A*,
+        the path excludes the start tile and is empty if the target cannot be reached"""
+        if start == target:
+            return []
+        if not self.is_open(*target):
+            return []
+        came_from = {start: None}
+        cost = {start: 0}
+        frontier = [(self.heuristic(start, target), 0, start)]
+        while frontier:
+            _, g, tile = heappop(frontier)
+            if tile == target:
+                break
+            if g > cost[tile]:
+                continue    # stale entry, a shorter route was already found
+            for n in self.neighbors(tile):
+                n_cost = g + 1
+                if n_cost < cost.get(n, n_cost + 1):
+                    cost[n] = n_cost
+                    came_from[n] = tile
+                    heappush(frontier, (n_cost + self.heuristic(n, target), n_cost, n))
+        if target not in came_from:
+            return []
+        path = []
+        tile = target
+        while tile != start:
+            path.append(tile)
+            tile = came_from[tile]
+        path.reverse()
+        return path
+
+    def distance_field(self, target):
+        """Return the cached breadth first distances from every tile to the target tile"""
+        field = self.fields.get(target)
+        if field is None:
+            field = [PathFinder.UNREACHABLE] * (self.rows * self.cols)
+            if self.is_open(*target):
+                field[target[0] * self.cols + target[1]] = 0
+                queue = deque([target])
+                while queue:
+                    tile = queue.popleft()
+                    dist = field[tile[0] * self.cols + tile[1]] + 1
+                    for n in self.neighbors(tile):
+                        idx = n[0] * self.cols + n[1]
+                        if field[idx] == PathFinder.UNREACHABLE:
+                            field[idx] = dist
+                            queue.append(n)
+            self.fields[target] = field
+        return field
+
+    def distance(self, start, target):
+        """Return the number of steps between two tiles, or UNREACHABLE"""
+        if not self.is_open(*start):
+            return PathFinder.UNREACHABLE
+        return self.distance_field(target)[start[0] * self.cols + start[1]]
+
+    def direction_to(self, start, target):
+        """Return the direction of the first step on a shortest route from the start tile to the target tile,
+        following the cached distance field, or None if the start is the target or cannot reach it"""
+        field = self.distance_field(target)
+        dist = field[start[0] * self.cols + start[1]] if self.is_open(*start) else PathFinder.UNREACHABLE
+        if dist <= 0:
+            return None
+        for d in self.tile_exits(start):
+            row, col = PathFinder.step(start, d)
+            if field[row * self.cols + col] == dist - 1:
+                return d
+        return None
+
+    def path_to(self, start, target):
+        """Follow the cached distance field for the target to produce a shortest path from the start tile"""
+        field = self.distance_field(target)
+        if not self.is_open(*start) or field[start[0] * self.cols + start[1]] == PathFinder.UNREACHABLE:
+            return []
+        path = []
+        tile = start
+        dist = field[tile[0] * self.cols + tile[1]]
+        while dist > 0:
+            for n in self.neighbors(tile):
+                if field[n[0] * self.cols + n[1]] == dist - 1:
+                    tile = n
+                    break
+            path.append(tile)
+            dist -= 1
+        return path
@@ -0,0 +1,110 @@
+import csv
+import json
+import math
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+from text_renderer import TextRenderer
+
+
+class NullProfiler:
+    """Stands in for FrameProfiler when profiling is off, doing nothing at minimal cost"""
+    enabled = False
+    NO_OP = nullcontext()
+
+    def section(self, name):
+        """Return a context which does not time anything"""
+        return NullProfiler.NO_OP
+
+    def end_frame(self):
+        """Do nothing"""
+
+
+class FrameProfiler:
+    """Records per-frame timings of instrumented subsystems, keeps rolling percentiles
+    for an on-screen overlay and can dump the full trace to CSV or JSON"""
+    enabled = True
+
+    def __init__(self, screen=None, window=300, refresh_frames=30, pos=(630, 10), color=(0, 255, 0)):
+        self.screen = screen
+        self.window = window    # number of recent frames used for the percentiles
+        self.refresh_frames = refresh_frames    # frames between overlay text updates
+        self.pos = pos
+        self.color = color
+        self.text = TextRenderer.get(None, 18)
+        self.recent = {}    # section name -> deque of recent timings in milliseconds
+        self.trace = []     # timings of every frame, in order
+        self.frame = {}
+        self.frame_count = 0
+        self.frame_start = perf_counter()
+        self.overlay = []   # (image, rect) pairs of the overlay text
+
+    @contextmanager
+    def section(self, name):
+        """Time the enclosed block, adding to the named section's total for this frame"""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.frame[name] = self.frame.get(name, 0.0) + (perf_counter() - start) * 1000
+
+    def end_frame(self):
+        """Close the current frame, recording its section timings and total duration"""
+        now = perf_counter()
+        self.frame['frame'] = (now - self.frame_start) * 1000
+        self.frame_start = now
+        for name, ms in self.frame.items():
+            if name not in self.recent:
+                self.recent[name] = deque(maxlen=self.window)
+            self.recent[name].append(ms)
+        self.trace.append(self.frame)
+        self.frame = {}
+        self.frame_count += 1
+        if self.screen and self.frame_count % self.refresh_frames == 0:
+            self.prep_overlay()
+
+    @staticmethod
+    def percentile(values, pct):
+        """Return the nearest-rank percentile of a collection of values"""
+        ordered = sorted(values)
+        if not ordered:
+            return 0.0
+        rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[rank]
+
+    def summary(self):
+        """Return the p50, p95 and p99 timings of every section over the recent window"""
+        return {name: tuple(FrameProfiler.percentile(values, p) for p in (50, 95, 99))
+                for name, values in self.recent.items()}
+
+    def prep_overlay(self):
+        """Render the current percentiles as overlay text"""
+        self.overlay.clear()
+        x, y = self.pos
+        lines = ['ms  p50 / p95 / p99']
+        lines += ['{}  {:.2f} / {:.2f} / {:.2f}'.format(name, *pcts) for name, pcts in sorted(self.summary().items())]
+        for line in lines:
+            image = self.text.render(line, self.color)
+            rect = image.get_rect()
+            rect.topleft = x, y
+            self.overlay.append((image, rect))
+            y += rect.height
+
+    def get_rects(self):
+        """Return the screen areas covered by the overlay"""
+        return [rect for _, rect in self.overlay]
+
+    def blit(self):
+        """Blit the overlay to the screen"""
+        self.screen.blits(self.overlay, doreturn=False)
+
+    def dump(self, path):
+        """Write every recorded frame to a CSV file, or a JSON file if the path ends with .json"""
+        names = sorted({name for frame in self.trace for name in frame})
+        with open(path, 'w', newline='') as file:
+            if path.endswith('.json'):
+                json.dump({'summary': self.summary(), 'frames': self.trace}, file)
+            else:
+                writer = csv.DictWriter(file, fieldnames=names, restval=0.0)
+                writer.writeheader()
+                writer.writerows(self.trace)
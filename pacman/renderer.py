@@ -0,0 +1,102 @@
+import pygame
+from profiler import NullProfiler
+
+
+class DirtyRectRenderer:
+    """Draws the game over a pre-baked maze background, redrawing and pushing to the display
+    only the screen areas which changed since the last frame"""
+    def __init__(self, screen, background_color=(0, 0, 0), profiler=None):
+        self.screen = screen
+        self.profiler = profiler or NullProfiler()
+        self.background_color = background_color
+        self.walls = None   # walls and shields only, used to erase eaten items
+        self.background = None  # walls, shields and all remaining items
+        self.maze_version = None    # (maze, layout version) the background was baked from
+        self.walls_version = None     # (maze, walls version) the walls surface was baked from
+        self.actor_rects = []   # areas covered by actors in the last frame
+        self.hud_rects = []
+        self.hud_key = None
+        self.overlay_rects = []
+        self.full_redraw = True
+
+    def invalidate(self):
+        """Force the next frame to be redrawn and pushed to the display in full"""
+        self.full_redraw = True
+
+    def bake(self, maze):
+        """Pre-render the maze walls and items into background surfaces, reusing the walls if unchanged"""
+        if self.walls_version != (maze, maze.walls_version):
+            self.walls = self.screen.copy()
+            self.walls.fill(self.background_color)
+            maze.maze_blocks.draw(self.walls)
+            maze.shield_blocks.draw(self.walls)
+            self.walls_version = (maze, maze.walls_version)
+        self.background = self.walls.copy()
+        maze.pellets.draw(self.background)
+        maze.power_pellets.draw(self.background)
+        maze.fruits.draw(self.background)
+        maze.dirty_rects.clear()
+        self.maze_version = (maze, maze.layout_version)
+
+    def restore(self, rect):
+        """Cover an area of the screen with the background"""
+        self.screen.blit(self.background, rect, rect)
+
+    def draw(self, maze, actors, hud, hud_key, overlay=None):
+        """Draw one frame, where actors are sprites that move every frame, hud items
+        only need redrawing when hud_key changes and an overlay is redrawn every frame"""
+        dirty = []
+        full = self.full_redraw or self.maze_version != (maze, maze.layout_version)
+        with self.profiler.section('maze.blit'):
+            if full:
+                self.bake(maze)
+                self.screen.blit(self.background, (0, 0))
+            else:
+                for rect in maze.dirty_rects:   # erase eaten items from the background
+                    self.background.blit(self.walls, rect, rect)
+                    self.restore(rect)
+                dirty.extend(maze.dirty_rects)
+                maze.dirty_rects.clear()
+                for rect in self.actor_rects + self.overlay_rects:
+                    self.restore(rect)
+                dirty.extend(self.actor_rects)
+                dirty.extend(self.overlay_rects)
+
+        with self.profiler.section('hud.blit'):
+            if full or hud_key != self.hud_key:
+                for rect in self.hud_rects:
+                    self.restore(rect)
+                dirty.extend(self.hud_rects)
+                for item in hud:
+                    item.blit()
+                self.hud_rects = [rect.copy() for item in hud for rect in item.get_rects()]
+                dirty.extend(self.hud_rects)
+                self.hud_key = hud_key
+
+        with self.profiler.section('actors.blit'):
+            blits = [(actor.image, actor.rect) for actor in actors]
+            self.screen.blits(blits, doreturn=False)    # one call for every actor's frame
+            self.actor_rects = [pygame.Rect(rect.topleft, image.get_size()) for image, rect in blits]
+            dirty.extend(self.actor_rects)
+
+        if overlay:
+            overlay.blit()
+            self.overlay_rects = [rect.copy() for rect in overlay.get_rects()]
+            dirty.extend(self.overlay_rects)
+
+        with self.profiler.section('display.flip'):
+            if full:
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty)
+        self.full_redraw = False
+
+    def draw_state(self, state, overlay=None):
+        """Draw a frame of a game state's maze, actors and HUD, returning False without drawing anything
+        while its level transition is showing"""
+        if state.level_transition.transition_show:
+            return False
+        hud_key = (state.score_keeper.score, state.score_keeper.item_counter.counter, state.life_counter.lives)
+        self.draw(state.maze, actors=[*state.ghosts, state.player], hud=[state.score_keeper, state.life_counter],
+                  hud_key=hud_key, overlay=overlay)
+        return True
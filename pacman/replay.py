@@ -0,0 +1,134 @@
+import argparse
+import random
+import struct
+import sys
+from time import perf_counter
+import pygame
+from game_state import GameState
+
+
+class ReplayLog:
+    """Compact binary log of a game's random seed, key input at each simulation step and the timers fired,
+    from which the game can be replayed exactly and as fast as the simulation can run"""
+    MAGIC = b'PMRL'
+    VERSION = 2
+    # magic, version, seed, steps, ghost count (0 for one per spawn point), length of the maze map file name
+    HEADER = struct.Struct('<4sHQIHH')
+    RECORD = struct.Struct('<IBI')  # step, kind, value
+
+    KEY_DOWN = 0    # record kinds, the value is the key
+    KEY_UP = 1
+    TIMER = 2   # the value is an index into TIMERS
+    END = 3     # the value is the final score
+
+    KINDS = {pygame.KEYDOWN: KEY_DOWN, pygame.KEYUP: KEY_UP}
+    EVENTS = {KEY_DOWN: pygame.KEYDOWN, KEY_UP: pygame.KEYUP}
+    TIMERS = (GameState.START_EVENT, GameState.REBUILD_EVENT, GameState.LEVEL_TRANSITION_EVENT,
+              GameState.GHOST_PHASE_EVENT)
+
+    def __init__(self, seed, maze_map_file='maze_map.txt', ghost_count=None):
+        self.seed = seed
+        self.maze_map_file = maze_map_file
+        self.ghost_count = ghost_count
+        self.steps = 0  # simulation steps recorded
+        self.records = []   # (step, kind, value) in the order they happened
+
+    @classmethod
+    def new_seed(cls):
+        """Return a random seed for a new recording"""
+        return random.SystemRandom().getrandbits(63)
+
+    def attach(self, state):
+        """Record the timers fired by a game state"""
+        state.on_timer = self.record_timer
+
+    def record_inputs(self, events):
+        """Record the key events applied in the next simulation step"""
+        for event in events:
+            if event.type in ReplayLog.KINDS:
+                self.records.append((self.steps, ReplayLog.KINDS[event.type], event.key))
+        self.steps += 1
+
+    def record_timer(self, name):
+        """Record a timer firing in the step whose inputs were recorded last"""
+        self.records.append((self.steps - 1, ReplayLog.TIMER, ReplayLog.TIMERS.index(name)))
+
+    def finish(self, score):
+        """Record the end of the game and its final score"""
+        self.records.append((self.steps, ReplayLog.END, score))
+
+    def save(self, path):
+        """Write the log to a file"""
+        name = self.maze_map_file.encode()
+        with open(path, 'wb') as file:
+            file.write(ReplayLog.HEADER.pack(ReplayLog.MAGIC, ReplayLog.VERSION, self.seed, self.steps,
+                                             self.ghost_count or 0, len(name)))
+            file.write(name)
+            file.write(b''.join(ReplayLog.RECORD.pack(*record) for record in self.records))
+
+    @classmethod
+    def load(cls, path):
+        """Read a log written by save"""
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, seed, steps, ghost_count, name_length = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError('{} is not a version {} replay log'.format(path, cls.VERSION))
+        offset = cls.HEADER.size
+        log = cls(seed, data[offset:offset + name_length].decode(), ghost_count or None)
+        log.steps = steps
+        log.records = list(cls.RECORD.iter_unpack(data[offset + name_length:]))
+        return log
+
+    def inputs(self):
+        """Return the key events to apply at each step, keyed by step"""
+        inputs = {}
+        for step, kind, value in self.records:
+            if kind in ReplayLog.EVENTS:
+                inputs.setdefault(step, []).append(pygame.event.Event(ReplayLog.EVENTS[kind], key=value))
+        return inputs
+
+    def timers(self):
+        """Return the (step, timer name) of every timer fired"""
+        return [(step, ReplayLog.TIMERS[value]) for step, kind, value in self.records if kind == ReplayLog.TIMER]
+
+    def final_score(self):
+        """Return the recorded final score, or None if the game did not finish"""
+        return next((value for _, kind, value in self.records if kind == ReplayLog.END), None)
+
+    def play(self, state, on_step=None):
+        """Feed the recorded inputs through a new game state, seeded and started as the recording was,
+        calling on_step after every step, and return True if every timer fired as recorded"""
+        inputs = self.inputs()
+        fired = []
+        step = 0
+        state.on_timer = lambda name: fired.append((step, name))
+        for step in range(self.steps):
+            state.step(inputs.get(step, ()))
+            if on_step:
+                on_step()
+        state.on_timer = None
+        return fired == self.timers()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded PacMan Portal game without a display')
+    parser.add_argument('log', help='replay log written with pacman_game.py --record')
+    args = parser.parse_args()
+
+    log = ReplayLog.load(args.log)
+    random.seed(log.seed)
+    state = GameState.headless(maze_map_file=log.maze_map_file, ghost_count=log.ghost_count)
+    state.start_game()
+    start = perf_counter()
+    timers_match = log.play(state)
+    elapsed = perf_counter() - start
+    score = state.score_keeper.score
+    print('{} steps in {:.2f}s ({:.0f} steps/s), score {} (recorded {}), timers {}'.format(
+        log.steps, elapsed, log.steps / elapsed if elapsed else 0, score, log.final_score(),
+        'match' if timers_match else 'DIVERGED'))
+    return 0 if timers_match and log.final_score() in (None, score) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,32 +1,38 @@
 from sound_manager import SoundManager
-import json
+from asset_cache import AssetCache
+from text_renderer import TextRenderer
+from layout import ScreenLayout
 import pygame
 
 
 class LevelTransition:
     """Displays a level transition"""
-    TRANSITION_CHANNEL = 4
+    TRANSITION_PRIORITY = 3
+    SOUND_FILES = ['GetLoud.wav']
 
-    def __init__(self, screen, score_controller, transition_time=5000):
+    def __init__(self, screen, score_controller, timers, transition_time=5000):
         self.screen = screen
+        self.timers = timers    # timer wheel of the game
         self.score_controller = score_controller
-        self.sound = SoundManager(['GetLoud.wav'], keys=['transition'],
-                                  channel=LevelTransition.TRANSITION_CHANNEL, volume=0.6)
-        self.font = pygame.font.Font('fonts/LuckiestGuy-Regular.ttf', 32)
-        self.ready_msg = self.font.render('Get Ready!', True, ScoreBoard.SCORE_WHITE)
+        self.sound = SoundManager(LevelTransition.SOUND_FILES, keys=['transition'],
+                                  priority=LevelTransition.TRANSITION_PRIORITY, volume=0.6)
+        self.text = TextRenderer.get('fonts/LuckiestGuy-Regular.ttf', ScreenLayout.of(screen).font_size(32))
+        self.ready_msg = self.text.render('Get Ready!', ScoreBoard.SCORE_WHITE)
         self.ready_msg_rect = self.ready_msg.get_rect()
         ready_pos = screen.get_width() // 2, int(screen.get_height() * 0.65)
         self.ready_msg_rect.centerx, self.ready_msg_rect.centery = ready_pos
         self.level_msg = None
         self.level_msg_rect = None
         self.transition_time = transition_time     # total time to wait until the transition ends
-        self.transition_begin = None
+        self.transition_timers = []
         self.transition_show = False
+        self.transition_ready = False   # half the time has passed, so the ready message shows
+        self.transition_done = False
 
     def prep_level_msg(self):
         """Prepare a message for the current level number"""
         text = 'level ' + str(self.score_controller.level)
-        self.level_msg = self.font.render(text, True, ScoreBoard.SCORE_WHITE)
+        self.level_msg = self.text.render(text, ScoreBoard.SCORE_WHITE)
         self.level_msg_rect = self.level_msg.get_rect()
         level_pos = self.screen.get_width() // 2, self.screen.get_height() // 2
         self.level_msg_rect.centerx, self.level_msg_rect.centery = level_pos
@@ -34,18 +40,33 @@ class LevelTransition:
     def set_show_transition(self):
         """Begin the sequence for displaying the transition"""
         self.prep_level_msg()
-        self.transition_begin = pygame.time.get_ticks()
+        for timer in self.transition_timers:
+            timer.cancel()
+        self.transition_ready = self.transition_done = False
+        self.transition_timers = [self.timers.call_after(self.transition_time // 2, self.set_ready),
+                                  self.timers.call_after(self.transition_time + 1, self.set_done)]
         self.transition_show = True
         self.sound.play('transition')
 
+    def set_ready(self):
+        """Show the ready message from now on"""
+        self.transition_ready = True
+
+    def set_done(self):
+        """Let the next update end the transition"""
+        self.transition_done = True
+
+    def update(self):
+        """End the transition once its display time has passed"""
+        if self.transition_done:
+            self.transition_show = False
+
     def draw(self):
         """Display the level transition to the screen"""
-        if abs(self.transition_begin - pygame.time.get_ticks()) > self.transition_time:
-            self.transition_show = False
-        else:
+        if self.transition_show:
             self.screen.fill((0, 0, 0))
             self.screen.blit(self.level_msg, self.level_msg_rect)
-            if abs(self.transition_begin - pygame.time.get_ticks()) >= self.transition_time // 2:
+            if self.transition_ready:
                 self.screen.blit(self.ready_msg, self.ready_msg_rect)
 
 
@@ -58,8 +79,9 @@ class ScoreBoard:
         self.screen = screen
         self.score = 0
         self.color = ScoreBoard.SCORE_WHITE
-        self.font = pygame.font.Font('fonts/LuckiestGuy-Regular.ttf', 36)
-        self.image = None
+        self.text = TextRenderer.get('fonts/LuckiestGuy-Regular.ttf', ScreenLayout.of(screen).font_size(36))
+        self.glyphs = None  # cached digit images and their x offsets
+        self.glyph_blits = None
         self.rect = None
         self.prep_image()
         self.pos = pos
@@ -68,12 +90,12 @@ class ScoreBoard:
     def position(self):
         """Re-position the scoreboard based on its pos value"""
         self.rect.centerx, self.rect.centery = self.pos
+        self.glyph_blits = [(image, (self.rect.x + x, self.rect.y)) for image, x in self.glyphs]
 
     def prep_image(self):
-        """Render the score to a font image"""
-        score_str = str(self.score)
-        self.image = self.font.render(score_str, True, self.color)
-        self.rect = self.image.get_rect()
+        """Lay out the cached digit images for the score"""
+        self.glyphs, size = self.text.glyph_run(str(self.score), self.color)
+        self.rect = pygame.Rect((0, 0), size)
 
     def update(self, n_score):
         """Increment the scoreboard and prepare a new image"""
@@ -89,7 +111,7 @@ class ScoreBoard:
 
     def blit(self):
         """Blit the score to the screen"""
-        self.screen.blit(self.image, self.rect)
+        self.screen.blits(self.glyph_blits, doreturn=False)
 
 
 class ItemCounter:
@@ -97,9 +119,14 @@ class ItemCounter:
     def __init__(self, screen, image_name, pos=(0, 0)):
         self.screen = screen
         self.counter = 0
-        self.item_image = pygame.image.load('images/' + image_name)
+        layout = ScreenLayout.of(screen)
+        self.item_image = AssetCache.image(image_name, convert=False)
+        if layout.scale != 1:   # scaled along with the text
+            width, height = self.item_image.get_size()
+            self.item_image = AssetCache.image(image_name, convert=False,
+                                               resize=(int(width * layout.scale), int(height * layout.scale)))
         self.item_rect = self.item_image.get_rect()
-        self.font = pygame.font.Font('fonts/LuckiestGuy-Regular.ttf', 36)
+        self.text = TextRenderer.get('fonts/LuckiestGuy-Regular.ttf', layout.font_size(36))
         self.color = ScoreBoard.SCORE_WHITE
         self.text_image = None
         self.text_rect = None
@@ -119,7 +146,7 @@ class ItemCounter:
     def prep_image(self):
         """Render the counter's image for future display"""
         text = str(self.counter) + ' X '
-        self.text_image = self.font.render(text, True, self.color)
+        self.text_image = self.text.render(text, self.color)
         self.text_rect = self.text_image.get_rect()
         self.position()
 
@@ -131,19 +158,17 @@ class ItemCounter:
 
     def blit(self):
         """Blit the counter to the screen"""
-        self.screen.blit(self.text_image, self.text_rect)
-        self.screen.blit(self.item_image, self.item_rect)
+        self.screen.blits(((self.text_image, self.text_rect), (self.item_image, self.item_rect)), doreturn=False)
 
 
 class ScoreController:
     """Handles scoring and representation of scores"""
-    def __init__(self, screen, items_image, sb_pos=(0, 0), itc_pos=(0, 0)):
+    def __init__(self, screen, items_image, sb_pos=(0, 0), itc_pos=(0, 0), score_store=None):
         self.score = 0
         self.level = 1
-        self.high_scores = []
+        self.score_store = score_store  # where finished games are saved, if anywhere
         self.scoreboard = ScoreBoard(screen=screen, pos=sb_pos)
         self.item_counter = ItemCounter(screen=screen, pos=itc_pos, image_name=items_image)
-        self.init_high_scores()
 
     def increment_level(self, up=1):
         """Add a number to the level"""
@@ -157,31 +182,22 @@ class ScoreController:
 
     def add_score(self, score, items=None):
         """Add new score and prepare for scoreboard display"""
-        self.scoreboard.update(score)
+        if score:
+            self.scoreboard.update(score)
         self.score = self.scoreboard.score
         if items:
             self.item_counter.add_items(items)
 
+    def get_rects(self):
+        """Return the screen areas covered by the score displays"""
+        return [self.scoreboard.rect, self.item_counter.text_rect, self.item_counter.item_rect]
+
     def blit(self):
         """Blit all score related displays to the screen"""
         self.scoreboard.blit()
         self.item_counter.blit()
 
-    def init_high_scores(self):
-        """Read saved high scores from local storage"""
-        try:
-            with open('score_data.json', 'r') as file:
-                self.high_scores = json.load(file)
-                self.high_scores.sort(reverse=True)
-        except (FileNotFoundError, ValueError, EOFError, json.JSONDecodeError) as e:
-            print(e)
-            self.high_scores = [0, 0, 0, 0, 0]
-
-    def save_high_scores(self):
-        """Save high scores to the disk"""
-        for i in range(len(self.high_scores)):
-            if self.score >= self.high_scores[i]:
-                self.high_scores[i] = self.score
-                break
-        with open('score_data.json', 'w') as file:
-            json.dump(self.high_scores, file)
+    def save_high_scores(self, name='PLAYER'):
+        """Queue the finished game's score, level and fruit count to be saved, without waiting on the disk"""
+        if self.score_store:
+            self.score_store.add(self.score, name, self.level, self.item_counter.counter)
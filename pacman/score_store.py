@@ -0,0 +1,135 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+
+ScoreRecord = namedtuple('ScoreRecord', ['score', 'name', 'level', 'fruit', 'played_at'])
+
+
+class ScoreStore:
+    """Every finished game's score kept in a local SQLite database. Scores are written by a background thread
+    in batched transactions, and the top scores are cached so they can be read without touching the database"""
+    SCHEMA = '''CREATE TABLE IF NOT EXISTS scores (
+                    id INTEGER PRIMARY KEY,
+                    score INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    level INTEGER,
+                    fruit INTEGER NOT NULL,
+                    played_at REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS scores_by_rank ON scores (score DESC, played_at);'''
+    INSERT = 'INSERT INTO scores (score, name, level, fruit, played_at) VALUES (?, ?, ?, ?, ?)'
+    TOP = 'SELECT score, name, level, fruit, played_at FROM scores ORDER BY score DESC, played_at LIMIT ?'
+    LEGACY_NAME = '---'     # name given to scores imported from score_data.json, which had neither name nor level
+    VERSION = 2
+    # version 1 stored the unknown level of imported scores as 0, and did not allow a level of NULL
+    MIGRATE_V1 = ('ALTER TABLE scores RENAME TO scores_v1; DROP INDEX scores_by_rank;' + SCHEMA +
+                  '''INSERT INTO scores
+                         SELECT id, score, name, CASE WHEN name = '{}' AND level = 0 THEN NULL ELSE level END,
+                                fruit, played_at
+                         FROM scores_v1;
+                     DROP TABLE scores_v1;'''.format(LEGACY_NAME))
+
+    def __init__(self, path='scores.db', top_n=5, legacy_file='score_data.json', batch_size=256):
+        self.path = path
+        self.top_n = top_n
+        self.batch_size = batch_size    # most scores written in one transaction
+        self.pending = queue.Queue()    # scores waiting to be written, then None to stop the writer
+        self.lock = threading.Lock()
+        self.unwritten = []     # queued scores not yet committed, kept in the cached top scores until they are
+        with self.connect() as connection:
+            self.create(connection, legacy_file)
+            self.top = self.query_top(connection, top_n)    # ordered best first
+        connection.close()
+        self.writer = threading.Thread(target=self.write_scores, name='score-writer', daemon=True)
+        self.writer.start()
+        atexit.register(self.close)     # write any pending scores before the process exits
+
+    def connect(self):
+        """Open a connection to the database"""
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute('PRAGMA journal_mode=WAL')   # readers are not blocked by the writer
+        return connection
+
+    def create(self, connection, legacy_file):
+        """Create the schema of a new database, importing the scores of the old JSON high score file,
+        or bring the schema of an older database up to date"""
+        version = connection.execute('PRAGMA user_version').fetchone()[0]
+        if version == 1:
+            connection.executescript(ScoreStore.MIGRATE_V1)
+            connection.execute('PRAGMA user_version = {}'.format(ScoreStore.VERSION))
+        if version > 0:
+            return
+        connection.executescript(ScoreStore.SCHEMA)
+        try:
+            with open(legacy_file, 'r') as file:
+                legacy_scores = json.load(file)
+            played_at = os.path.getmtime(legacy_file)
+            connection.executemany(ScoreStore.INSERT, [(int(score), ScoreStore.LEGACY_NAME, None, 0, played_at)
+                                                       for score in legacy_scores if score])
+        except (OSError, ValueError, TypeError):
+            pass    # nothing to import
+        connection.execute('PRAGMA user_version = {}'.format(ScoreStore.VERSION))
+
+    @staticmethod
+    def query_top(connection, n):
+        """Return the n best scores in the database"""
+        return [ScoreRecord(*row) for row in connection.execute(ScoreStore.TOP, (n,))]
+
+    @staticmethod
+    def rank(record):
+        """Sort key putting the best scores first, earlier games first on ties, as the database orders them"""
+        return -record.score, record.played_at
+
+    def ranked(self, records):
+        """Return the best of the given scores, best first"""
+        top = sorted(records, key=ScoreStore.rank)
+        del top[self.top_n:]
+        return top
+
+    def add(self, score, name, level, fruit):
+        """Queue a finished game's score to be written, and update the cached top scores at once"""
+        record = ScoreRecord(score, name, level, fruit, time.time())
+        with self.lock:
+            self.unwritten.append(record)
+            self.top = self.ranked(self.top + [record])
+        self.pending.put(record)
+
+    def top_scores(self):
+        """Return the cached best scores, best first, without waiting on the database"""
+        return self.top
+
+    def write_scores(self):
+        """Write queued scores on the writer thread, committing everything queued so far in one transaction"""
+        connection = self.connect()
+        running = True
+        while running:
+            batch = [self.pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [record for record in batch if record is not None]
+            if batch:
+                with connection:    # commits atomically, or rolls back if anything fails
+                    connection.executemany(ScoreStore.INSERT, [(r.score, r.name, r.level, r.fruit, r.played_at)
+                                                               for r in batch])
+                top = self.query_top(connection, self.top_n)
+                with self.lock:     # scores queued while the batch was written are not in the database yet
+                    for record in batch:
+                        self.unwritten.remove(record)
+                    self.top = self.ranked(top + self.unwritten)
+        connection.close()
+
+    def close(self):
+        """Write any pending scores and stop the writer thread"""
+        if self.writer.is_alive():
+            self.pending.put(None)
+            self.writer.join()
@@ -0,0 +1,165 @@
+import argparse
+import atexit
+import json
+import random
+import statistics
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+import pygame
+from game_state import GameState
+from ghost import GhostState
+from maze import Maze
+
+
+class RandomController:
+    """Presses a random direction key at a fixed interval"""
+    KEYS = [pygame.K_UP, pygame.K_LEFT, pygame.K_DOWN, pygame.K_RIGHT]
+
+    def __init__(self, rand, interval=20):
+        self.rand = rand
+        self.interval = interval
+
+    def inputs(self, state, step):
+        """Return the key events to apply in this step"""
+        if step % self.interval == 0:
+            return [pygame.event.Event(pygame.KEYDOWN, key=self.rand.choice(RandomController.KEYS))]
+        return []
+
+
+class PelletSeeker:
+    """Steers PacMan along the shortest route to the nearest item, avoiding tiles next to dangerous ghosts"""
+    KEYS = {(-1, 0): pygame.K_UP, (1, 0): pygame.K_DOWN, (0, -1): pygame.K_LEFT, (0, 1): pygame.K_RIGHT}
+    DIRECTIONS = {pygame.K_UP: 'u', pygame.K_DOWN: 'd', pygame.K_LEFT: 'l', pygame.K_RIGHT: 'r'}
+
+    def __init__(self, rand):
+        self.rand = rand
+
+    @staticmethod
+    def tile_of(maze, rect):
+        """Return the tile a rect's top left corner is in"""
+        return maze.screen_layout.tile_at(rect.x, rect.y)
+
+    @staticmethod
+    def is_open(maze, tile):
+        """Return True if PacMan can move through a tile"""
+        row, col = tile
+        return maze.path_finder.is_open(row, col) and maze.grid[row * maze.grid_cols + col] == Maze.OPEN_TILE
+
+    def danger(self, state):
+        """Return the tiles occupied by ghosts which can catch PacMan, and their neighbors"""
+        tiles = set()
+        for g in state.ghosts:
+            if g.state.enabled and g.state.mode == GhostState.NORMAL:
+                row, col = self.tile_of(state.maze, g.rect)
+                tiles.update(((row, col), (row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)))
+        return tiles
+
+    def first_step(self, state, start, avoid):
+        """Breadth first search from PacMan to the nearest tile with an item, returning the first step"""
+        maze = state.maze
+        items = (maze.pellet_index.cells, maze.power_index.cells, maze.fruit_index.cells)
+        previous = {start: None}
+        frontier = deque([start])
+        while frontier:
+            tile = frontier.popleft()
+            if tile != start and any(tile in cells for cells in items):
+                while previous[tile] != start:
+                    tile = previous[tile]
+                return tile
+            row, col = tile
+            for n in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1)):
+                if n not in previous and n not in avoid and self.is_open(maze, n):
+                    previous[n] = tile
+                    frontier.append(n)
+        return None
+
+    def inputs(self, state, step):
+        """Return the key events to apply in this step, only turning when PacMan is aligned with a tile"""
+        maze, player = state.maze, state.player
+        if not maze.screen_layout.is_aligned(player.rect.x, player.rect.y):
+            return []
+        start = self.tile_of(maze, player.rect)
+        target = self.first_step(state, start, self.danger(state)) or self.first_step(state, start, ())
+        if target is None:
+            return []
+        key = PelletSeeker.KEYS.get((target[0] - start[0], target[1] - start[1]))
+        if key is None or (player.moving and player.direction == PelletSeeker.DIRECTIONS[key]):
+            return []
+        return [pygame.event.Event(pygame.KEYDOWN, key=key)]
+
+
+CONTROLLERS = {'seeker': PelletSeeker, 'random': RandomController}
+
+worker_state = None     # each worker's game, loaded once and reset for every episode
+
+
+def init_worker(maze_map_file, ghost_count=None):
+    """Load the maze and assets once in each worker process"""
+    global worker_state
+    if worker_state:
+        worker_state.close()
+    worker_state = GameState.headless(maze_map_file=maze_map_file, ghost_count=ghost_count)
+    atexit.register(worker_state.close)
+
+
+def run_episode(seed, controller='seeker', max_steps=60 * 60 * 10):
+    """Play one game from a seed, returning its score, level reached and how long PacMan survived"""
+    state = worker_state
+    state.reset(seed)
+    state.start_game()
+    player = CONTROLLERS[controller](random.Random(seed))
+    step = 0
+    while not state.game_over and step < max_steps:
+        state.step(player.inputs(state, step))
+        step += 1
+    return {'seed': seed, 'score': state.score_keeper.score, 'level': state.score_keeper.level,
+            'survival_s': step * GameState.STEP_MS / 1000, 'finished': state.game_over}
+
+
+def summarize(episodes):
+    """Aggregate the results of many episodes"""
+    scores = sorted(e['score'] for e in episodes)
+    survival = [e['survival_s'] for e in episodes]
+    return {'games': len(episodes),
+            'finished': sum(e['finished'] for e in episodes),
+            'score_mean': statistics.mean(scores),
+            'score_median': statistics.median(scores),
+            'score_p95': scores[min(len(scores) - 1, int(len(scores) * 0.95))],
+            'score_max': scores[-1],
+            'levels': dict(sorted(Counter(e['level'] for e in episodes).items())),
+            'survival_mean_s': statistics.mean(survival),
+            'survival_median_s': statistics.median(survival)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play many headless PacMan Portal games in parallel')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--controller', choices=sorted(CONTROLLERS), default='seeker')
+    parser.add_argument('--max-steps', type=int, default=60 * 60 * 10,
+                        help='steps before an unfinished game is stopped (default: 10 minutes)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game, later games count up')
+    parser.add_argument('--maze', default='maze_map.txt', help='maze map file')
+    parser.add_argument('--ghosts', type=int, metavar='N', help='number of ghosts (default: one per spawn point)')
+    parser.add_argument('--output', '-o', metavar='PATH', help='write the summary and every episode as JSON')
+    args = parser.parse_args()
+
+    seeds = range(args.seed, args.seed + args.games)
+    start = perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args.maze, args.ghosts)) as executor:
+        episodes = list(executor.map(run_episode, seeds, [args.controller] * args.games,
+                                     [args.max_steps] * args.games))
+    summary = summarize(episodes)
+    summary['elapsed_s'] = perf_counter() - start
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'summary': summary, 'episodes': episodes}, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
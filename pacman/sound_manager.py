@@ -1,31 +1,47 @@
-import pygame
+from audio_bank import AudioBank
 
 
 class SoundManager:
-    """Handles the playing of sound over pygame mixer"""
-    def __init__(self, sound_files, keys=None, channel=0, volume=None):
+    """Handles the playing of a set of sounds over channels from the audio bank's pool, at one priority"""
+    def __init__(self, sound_files, keys=None, priority=0, volume=None):
         self.sound_files = sound_files
         self.sounds = {}
-        self.channel = pygame.mixer.Channel(channel)
-        if not keys:
-            for s_file in sound_files:
-                self.sounds[s_file] = pygame.mixer.Sound('sounds/' + s_file)
-        else:
-            if len(keys) != len(sound_files):
-                raise ValueError('number of keys must be the same as the number of sound files')
-            for key, s_file in zip(keys, sound_files):
-                self.sounds[key] = pygame.mixer.Sound('sounds/' + s_file)
-        if isinstance(volume, float):
-            self.channel.set_volume(volume)
+        self.priority = priority    # sounds of a higher priority may take over the channels of these
+        self.volume = volume if isinstance(volume, float) else 1.0
+        if keys and len(keys) != len(sound_files):
+            raise ValueError('number of keys must be the same as the number of sound files')
+        for key, s_file in zip(keys or sound_files, sound_files):
+            self.sounds[key] = AudioBank.load(s_file)   # None if the file is missing
+        self.channels = {}  # key -> channel each sound was last started on
+        self.loop_key = None    # key of the looping sound, only one loops at a time
+
+    def is_playing(self, key):
+        """Return True if a sound started by this manager is still playing on its channel"""
+        channel = self.channels.get(key)
+        return bool(channel and channel.get_busy() and channel.get_sound() is self.sounds[key])
+
+    def start(self, key, loops):
+        """Play a sound on a pooled channel, leaving it to carry on if it is already playing"""
+        if not self.is_playing(key):
+            channel = AudioBank.play(self.sounds[key], self.priority, loops=loops, volume=self.volume)
+            if channel:
+                self.channels[key] = channel
 
     def play(self, key):
         """Play a sound once"""
-        self.channel.play(self.sounds[key], loops=0)
+        self.start(key, loops=0)
 
     def play_loop(self, key):
-        """Loop a sound indefinitely"""
-        self.channel.play(self.sounds[key], loops=-1)
+        """Loop a sound indefinitely, in place of any other sound looping"""
+        if self.loop_key != key and self.is_playing(self.loop_key):
+            self.channels[self.loop_key].stop()
+        self.loop_key = key
+        self.start(key, loops=-1)
 
     def stop(self):
         """Stop sound from playing"""
-        self.channel.stop()
+        for key in list(self.channels):
+            if self.is_playing(key):
+                self.channels[key].stop()
+        self.channels.clear()
+        self.loop_key = None
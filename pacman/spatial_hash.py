@@ -0,0 +1,72 @@
+class SpatialHash:
+    """Indexes sprites by the grid cells their rects overlap, so collision tests only look at nearby sprites"""
+    def __init__(self, cell_size, origin=(0, 0), static=False):
+        self.cell_size = cell_size
+        self.origin = origin    # screen position of the top left corner of cell (0, 0)
+        self.cells = {}     # (row, col) -> {sprite: order added}
+        self.sprites = {}   # sprite -> cells it occupies
+        self.added = 0
+        self.static = static    # sprites never move, so their cells are remembered for when they are re-added
+        self.known_cells = {}
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def __contains__(self, sprite):
+        return sprite in self.sprites
+
+    def cells_under(self, rect):
+        """Return every cell overlapped by a rect"""
+        x, y = self.origin
+        size = self.cell_size
+        first_col, last_col = (rect.left - x) // size, (rect.right - 1 - x) // size
+        first_row, last_row = (rect.top - y) // size, (rect.bottom - 1 - y) // size
+        return [(row, col) for row in range(first_row, last_row + 1) for col in range(first_col, last_col + 1)]
+
+    def add(self, sprite):
+        """Index a sprite under every cell its rect overlaps"""
+        cells = self.known_cells.get(sprite) if self.static else None
+        if cells is None:
+            cells = self.cells_under(sprite.rect)
+            if self.static:
+                self.known_cells[sprite] = cells
+        self.sprites[sprite] = cells
+        for cell in cells:
+            self.cells.setdefault(cell, {})[sprite] = self.added
+        self.added += 1
+
+    def remove(self, sprite):
+        """Remove a sprite from the index, returning True if it was indexed"""
+        cells = self.sprites.pop(sprite, None)
+        if cells is None:
+            return False
+        for cell in cells:
+            bucket = self.cells[cell]
+            del bucket[sprite]
+            if not bucket:
+                del self.cells[cell]
+        return True
+
+    def clear(self):
+        """Remove every sprite from the index"""
+        self.cells.clear()
+        self.sprites.clear()
+        self.added = 0
+
+    def collide_any(self, rect):
+        """Return the earliest added sprite colliding with a rect, or None,
+        matching pygame.sprite.spritecollideany over a group filled in the same order"""
+        x, y = self.origin
+        size = self.cell_size
+        first_col, last_col = (rect.left - x) // size, (rect.right - 1 - x) // size
+        cells = self.cells
+        found = None
+        first = None
+        for row in range((rect.top - y) // size, (rect.bottom - 1 - y) // size + 1):
+            for col in range(first_col, last_col + 1):
+                bucket = cells.get((row, col))
+                if bucket:
+                    for sprite, order in bucket.items():
+                        if (first is None or order < first) and rect.colliderect(sprite.rect):
+                            found, first = sprite, order
+        return found
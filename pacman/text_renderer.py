@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from asset_cache import AssetCache
+
+
+class TextRenderer:
+    """Renders text in one font, keeping an LRU cache of rendered strings and a cache of single character glyphs"""
+    renderers = {}  # shared renderers, keyed by (font file, size)
+
+    def __init__(self, font, max_entries=64):
+        self.font = font
+        self.max_entries = max_entries
+        self.strings = OrderedDict()    # (text, color, antialias) -> surface, least recently used first
+        self.glyphs = {}    # (character, color) -> surface
+
+    @classmethod
+    def get(cls, font_file, size):
+        """Return the shared renderer for a font file and size"""
+        key = (font_file, size)
+        renderer = cls.renderers.get(key)
+        if renderer is None:
+            renderer = cls(AssetCache.font(font_file, size))
+            cls.renderers[key] = renderer
+        return renderer
+
+    def render(self, text, color, antialias=True):
+        """Return the rendered text, only rasterizing strings that are not already cached"""
+        key = (text, tuple(color), antialias)
+        image = self.strings.get(key)
+        if image is None:
+            image = self.font.render(text, antialias, color)
+            self.strings[key] = image
+            if len(self.strings) > self.max_entries:
+                self.strings.popitem(last=False)    # drop the least recently used string
+        else:
+            self.strings.move_to_end(key)
+        return image
+
+    def glyph(self, char, color):
+        """Return the rendered image of a single character"""
+        key = (char, tuple(color))
+        image = self.glyphs.get(key)
+        if image is None:
+            image = self.font.render(char, True, color)
+            self.glyphs[key] = image
+        return image
+
+    def glyph_run(self, text, color):
+        """Return the glyph images for each character of the text, with their x offsets and the total size"""
+        run = []
+        x = 0
+        height = 0
+        for char in text:
+            image = self.glyph(char, color)
+            run.append((image, x))
+            x += image.get_width()
+            height = max(height, image.get_height())
+        return run, (x, height)
@@ -0,0 +1,64 @@
+class Timer:
+    """A callback waiting in a timer wheel for its deadline, repeating every interval if one is given"""
+    __slots__ = ('deadline', 'interval', 'callback', 'order', 'cancelled')
+
+    def __init__(self, deadline, interval, callback, order):
+        self.deadline = deadline    # clock ticks at which the callback is due
+        self.interval = interval
+        self.callback = callback
+        self.order = order  # callbacks due in the same tick are called in the order they were scheduled
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the callback from being called, a timer which already fired is left as it is"""
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Calls back at deadlines on a clock, checked whenever the owner of the clock ticks the wheel after advancing
+    it, so nothing has to poll the clock. Timers are kept in a ring of slots by their deadline, each slot covering
+    a span of milliseconds, so a tick only looks at the timers due since the last one"""
+    def __init__(self, clock, slot_ms=16, slots=256):
+        self.clock = clock
+        self.slot_ms = slot_ms
+        self.slots = [[] for _ in range(slots)]
+        self.cursor = clock.get_ticks() // slot_ms  # the slot of the last tick, not yet fully passed
+        self.scheduled = 0  # number of timers ever scheduled, giving each its order
+
+    def call_at(self, deadline, callback, interval=0):
+        """Call back on the first tick at or after a deadline in clock ticks, and every interval after that
+        if the interval is above 0, returning the timer so that it can be cancelled"""
+        timer = Timer(deadline, interval, callback, self.scheduled)
+        self.scheduled += 1
+        self.insert(timer)
+        return timer
+
+    def call_after(self, delay, callback, interval=0):
+        """Call back on the first tick at least delay milliseconds from now, see call_at"""
+        return self.call_at(self.clock.get_ticks() + delay, callback, interval)
+
+    def insert(self, timer):
+        """Put a timer in the slot of its deadline, or of the last tick if that has passed already"""
+        slot = max(timer.deadline // self.slot_ms, self.cursor)
+        self.slots[slot % len(self.slots)].append(timer)
+
+    def tick(self):
+        """Call back every timer whose deadline has been reached, in deadline order"""
+        now = self.clock.get_ticks()
+        last = now // self.slot_ms
+        due = []
+        for slot in range(self.cursor, min(last, self.cursor + len(self.slots) - 1) + 1):
+            timers = self.slots[slot % len(self.slots)]
+            if timers:
+                waiting = [t for t in timers if t.deadline > now and not t.cancelled]
+                due.extend(t for t in timers if t.deadline <= now and not t.cancelled)
+                timers[:] = waiting
+        self.cursor = last
+        due.sort(key=lambda t: (t.deadline, t.order))
+        for timer in due:
+            if timer.cancelled:     # by an earlier callback in this tick
+                continue
+            if timer.interval > 0:  # rescheduled first, so the callback may cancel it
+                timer.deadline += timer.interval
+                self.insert(timer)
+            timer.callback()